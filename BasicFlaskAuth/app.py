@@ -1,8 +1,12 @@
-from flask import Flask, request, abort
-import json
+from flask import Flask, request, abort, jsonify
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from jose import jwt
-from urllib.request import urlopen
+
+from jwks import JWKSCache
+from token_cache import TokenCache
 
 
 app = Flask(__name__)
@@ -11,6 +15,15 @@ AUTH0_DOMAIN = @TODO_REPLACE_WITH_YOUR_DOMAIN
 ALGORITHMS = ['RS256']
 API_AUDIENCE = @TODO_REPLACE_WITH_YOUR_API_AUDIENCE
 
+# signing keys by kid, fetched once instead of on every verification
+jwks_cache = JWKSCache(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
+# verified payloads by token hash, so a reused token is not verified again
+token_cache = TokenCache()
+# async views verify signatures on this many threads, 0 keeps them inline
+AUTH_VERIFY_WORKERS = int(os.environ.get('AUTH_VERIFY_WORKERS', 0))
+verify_executor = ThreadPoolExecutor(AUTH_VERIFY_WORKERS) \
+    if AUTH_VERIFY_WORKERS > 0 else None
+
 
 class AuthError(Exception):
     def __init__(self, error, status_code):
@@ -51,26 +64,17 @@ def get_token_auth_header():
     return token
 
 
-def verify_decode_jwt(token):
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
+def get_unverified_kid(token):
     unverified_header = jwt.get_unverified_header(token)
-    rsa_key = {}
     if 'kid' not in unverified_header:
         raise AuthError({
             'code': 'invalid_header',
             'description': 'Authorization malformed.'
         }, 401)
+    return unverified_header['kid']
 
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
+
+def decode_jwt(token, rsa_key):
     if rsa_key:
         try:
             payload = jwt.decode(
@@ -105,15 +109,47 @@ def verify_decode_jwt(token):
             }, 400)
 
 
+def verify_decode_jwt(token):
+    return decode_jwt(token, jwks_cache.get_key(get_unverified_kid(token)))
+
+
+async def verify_decode_jwt_async(token):
+    # the JWKS refetch, and with AUTH_VERIFY_WORKERS the signature check,
+    # run on threads so the event loop keeps serving other requests
+    rsa_key = await jwks_cache.get_key_async(get_unverified_kid(token))
+    if verify_executor is None:
+        return decode_jwt(token, rsa_key)
+    return await asyncio.get_running_loop().run_in_executor(
+        verify_executor, decode_jwt, token, rsa_key)
+
+
 def requires_auth(f):
+    # async def views need Flask 2.0+ installed with the async extra
+    if asyncio.iscoroutinefunction(f):
+        @wraps(f)
+        async def async_wrapper(*args, **kwargs):
+            token = get_token_auth_header()
+            verified = token_cache.get(token)
+            if verified is None:
+                try:
+                    verified = token_cache.put(
+                        token, await verify_decode_jwt_async(token))
+                except Exception:
+                    abort(401)
+            return await f(verified.payload, *args, **kwargs)
+
+        return async_wrapper
+
     @wraps(f)
     def wrapper(*args, **kwargs):
         token = get_token_auth_header()
-        try:
-            payload = verify_decode_jwt(token)
-        except:
-            abort(401)
-        return f(payload, *args, **kwargs)
+        verified = token_cache.get(token)
+        if verified is None:
+            try:
+                verified = token_cache.put(token, verify_decode_jwt(token))
+            except:
+                abort(401)
+        return f(verified.payload, *args, **kwargs)
 
     return wrapper
 
@@ -121,4 +157,8 @@ def requires_auth(f):
 @requires_auth
 def headers(payload):
     print(payload)
-    return 'Access Granted'
\ No newline at end of file
+    return 'Access Granted'
+
+@app.route('/auth/stats')
+def auth_stats():
+    return jsonify(token_cache.stats())
\ No newline at end of file
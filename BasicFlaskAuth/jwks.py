@@ -0,0 +1,184 @@
+# This is a copy of the coffee shop backend's src/auth/jwks.py, kept here so
+# BasicFlaskAuth runs on its own. Keep the two files identical apart from
+# this note: make every change in both.
+
+import asyncio
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+JWKS_TTL = 10 * 60
+# an unknown kid triggers at most one refetch per this many seconds, so
+# tokens with made up kids cannot turn into a flood of JWKS requests
+JWKS_MIN_REFETCH_INTERVAL = 30
+JWKS_TIMEOUT = 5
+
+
+class _Flight(object):
+    '''a JWKS fetch in progress, shared by every caller waiting on it'''
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class JWKSCache(object):
+    '''
+    Signing keys of a JWKS endpoint, cached by kid
+
+    Keys are fetched once and served from memory. Once older than ttl they
+    are still served while a background thread refetches them. A kid that
+    is not cached triggers a synchronous refetch, at most once every
+    min_refetch_interval seconds. Concurrent refetches are single-flight:
+    one thread fetches, the others wait for its result.
+
+    http(s) URLs are fetched over one kept-alive connection, reopened when
+    the server closed it. Any other URL urlopen reads works too, e.g. a
+    file:// JWKS in tests.
+    '''
+
+    def __init__(self, url, ttl=JWKS_TTL,
+                 min_refetch_interval=JWKS_MIN_REFETCH_INTERVAL,
+                 timeout=JWKS_TIMEOUT):
+        self.url = url
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self.fetches = 0
+        self.connections = 0
+        # (keys by kid, fetched_at), swapped as a whole
+        self._state = ({}, None)
+        self._attempted_at = None
+        self._lock = threading.Lock()
+        self._flight = None
+        self._connection = None
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _read(self):
+        # only the leader of a flight reads, so the connection is never
+        # shared by two threads
+        parts = urlsplit(self.url)
+        if parts.scheme not in ('http', 'https'):
+            with urlopen(self.url, timeout=self.timeout) as response:
+                return response.read()
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        while True:
+            reused = self._connection is not None
+            if not reused:
+                connection_class = http.client.HTTPSConnection \
+                    if parts.scheme == 'https' else http.client.HTTPConnection
+                self._connection = connection_class(parts.netloc,
+                                                    timeout=self.timeout)
+                self.connections += 1
+            try:
+                self._connection.request('GET', path)
+                response = self._connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                self._close()
+                # a kept-alive connection the server has since closed
+                # fails on first use, retry once on a new one
+                if reused:
+                    continue
+                raise
+            if response.will_close:
+                self._close()
+            if response.status != 200:
+                raise http.client.HTTPException(
+                    f'JWKS request failed with HTTP {response.status}')
+            return body
+
+    def _fetch(self):
+        jwks = json.loads(self._read())
+        self.fetches += 1
+        return {
+            key['kid']: {
+                'kty': key['kty'],
+                'kid': key['kid'],
+                'use': key['use'],
+                'n': key['n'],
+                'e': key['e']
+            }
+            for key in jwks['keys'] if 'kid' in key
+        }
+
+    def refresh(self, wait=True):
+        '''
+        Refetches the key set, or joins the fetch already in progress
+        with wait=False it returns right away and never raises
+        '''
+        with self._lock:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+                self._attempted_at = time.monotonic()
+        if leader:
+            try:
+                keys = self._fetch()
+                self._state = (keys, time.monotonic())
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    self._flight = None
+                flight.done.set()
+        elif wait:
+            flight.done.wait(self.timeout)
+        if wait and flight.error is not None:
+            raise flight.error
+
+    def _refresh_in_background(self):
+        if self._flight is None:
+            threading.Thread(target=self.refresh, kwargs={'wait': False},
+                             daemon=True).start()
+
+    def _cached_key(self, kid):
+        '''
+        Returns (key, refetch): the cached key for kid, or None, and whether
+        the caller should refetch the keys before giving up on kid
+        '''
+        keys, fetched_at = self._state
+        now = time.monotonic()
+        may_refetch = fetched_at is None or \
+            now - self._attempted_at >= self.min_refetch_interval
+        key = keys.get(kid)
+        if key is not None:
+            if now - fetched_at >= self.ttl and may_refetch:
+                self._refresh_in_background()
+            return key, False
+        return None, may_refetch
+
+    def _refetch_key(self, kid):
+        # another caller's refetch may have brought kid in meanwhile
+        key = self._state[0].get(kid)
+        if key is None:
+            self.refresh()
+            key = self._state[0].get(kid)
+        return key
+
+    def get_key(self, kid):
+        '''returns the key for kid, or None when the issuer has no such key'''
+        key, refetch = self._cached_key(kid)
+        if refetch:
+            key = self._refetch_key(kid)
+        return key
+
+    async def get_key_async(self, kid):
+        '''
+        get_key for coroutines
+        a refetch runs on the loop's default executor, so the event loop
+        keeps serving other requests while the keys are fetched
+        '''
+        key, refetch = self._cached_key(kid)
+        if refetch:
+            key = await asyncio.get_running_loop().run_in_executor(
+                None, self._refetch_key, kid)
+        return key
@@ -0,0 +1,83 @@
+# This is a copy of the coffee shop backend's src/auth/token_cache.py, kept
+# here so BasicFlaskAuth runs on its own. Keep the two files identical apart
+# from this note: make every change in both.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+TOKEN_CACHE_SIZE = 1024
+
+# permissions is the frozenset of the token's permissions claim, or None
+# when the token has none
+VerifiedToken = namedtuple('VerifiedToken',
+                           ['payload', 'permissions', 'expires_at'])
+
+
+class TokenCache(object):
+    '''
+    Bounded LRU of verified JWT payloads
+
+    Entries are keyed by the SHA-256 of the raw token, so a client reusing
+    its bearer token skips signature verification, and expire at the
+    token's exp claim. Tokens without exp are never cached.
+    '''
+
+    def __init__(self, max_entries=TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        '''returns the VerifiedToken of a token verified before, or None'''
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, token, payload):
+        '''caches the payload of a verified token and returns its entry'''
+        permissions = payload.get('permissions')
+        entry = VerifiedToken(
+            payload,
+            frozenset(permissions) if permissions is not None else None,
+            payload.get('exp'))
+        if not isinstance(entry.expires_at, (int, float)):
+            return entry
+        with self._lock:
+            self._entries[self._key(token)] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -5,26 +5,46 @@
 import json
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+import babel.dates
+from functools import lru_cache
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort, jsonify
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
 from models import *
 from forms import *
+from queries import venue_areas, venue_show_timeline, artist_show_timeline, \
+	show_page, decode_show_cursor, decode_artist_cursor, artist_page, \
+	ARTIST_INDEX_LETTERS
+from search import search
+from cache import page_cache
+from importer import import_command
 import sys
-from collections import defaultdict
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-	date = dateutil.parser.parse(value)
-	if format == 'full':
-			format="EEEE MMMM, d, y 'at' h:mma"
-	elif format == 'medium':
-			format="EE MM, dd, y h:mma"
-	return babel.dates.format_datetime(date, format)
+DATETIME_FORMATS = {
+	'full': "EEEE MMMM, d, y 'at' h:mma",
+	'medium': "EE MM, dd, y h:mma",
+}
+
+@lru_cache(maxsize=None)
+def compile_datetime_format(format, locale):
+	# parsing a Babel pattern and resolving a locale only happens once per pair
+	return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel.Locale.parse(locale)
+
+@lru_cache(maxsize=4096)
+def _format_datetime(date, format, locale):
+	pattern, locale = compile_datetime_format(format, locale)
+	return pattern.apply(date, locale)
+
+def format_datetime(value, format='medium', locale=None):
+	# accepts datetime objects directly; strings are still parsed for old callers
+	if isinstance(value, str):
+		value = dateutil.parser.parse(value)
+	return _format_datetime(value, format, locale or babel.dates.LC_TIME)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
@@ -41,72 +61,33 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@page_cache.cached
 def venues():
-
-	current_time = datetime.now()
-	venues = Venue.query.all()
-	data_dict = defaultdict(dict)
-	
-	for venue in venues:
-		# data_dict --> key city_state
-		data_dict_key = venue.city + '_' + venue.state
-		# TODO: replace with real venues data.
-		# num_shows should be aggregated based on number of upcoming shows per venue.
-		num_upcoming_shows = venue.shows.filter(Show.start_time > current_time).count()
-		venue_obj = {
-					"id": venue.id,
-					"name": venue.name,
-					"num_upcoming_shows": num_upcoming_shows
-					}
-		if data_dict_key not in data_dict:
-			data_dict[data_dict_key] = {
-				"city": venue.city,
-				"state": venue.state,
-				"venues": [venue_obj]
-			}
-		else:
-			# update the venues element only 
-			data_dict[data_dict_key]['venues'].append(venue_obj)
-
-	data = list(data_dict.values())
+	# areas and their upcoming show counts come back from one grouped query
+	data = venue_areas()
 	return render_template('pages/venues.html', areas=data);
 
 @app.route('/venues/search', methods=['GET', 'POST'])
 def search_venues():
-	search_term = request.form.get('search_term','') 
-	result = Venue.query.filter(Venue.name.ilike(f'%{search_term}%'))
+	search_term = request.values.get('search_term', '')
 	# TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
 	# seach for Hop should return "The Musical Hop".
 	# search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-	response={
-		"count": result.count(),
-		"data": result.all()
-	}
-	return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+	# ranked page and total match count from the configured search backend
+	response = search(Venue, search_term, page=request.values.get('page', 1, type=int))
+	return render_template('pages/search_venues.html', results=response, search_term=search_term)
 
 @app.route('/venues/<int:venue_id>')
+@page_cache.cached
 def show_venue(venue_id):
 	# shows the venue page with the given venue_id
 	# TODO: replace with real venue data from the venues table, using venue_id
 	data = {}
 	venue = Venue.query.get(venue_id)
-	current_time = datetime.now()
 
 	if venue:
-		shows = Show.query.filter_by(venue_id=venue_id)
-		upcoming_shows = []
-		past_shows = []
-		for show in shows:
-			show_details = {
-				"artist_id": show.artist_id,
-				"artist_name": show.artist.name,
-				"artist_image_link": show.artist.image_link,
-				"start_time": format_datetime(str(show.start_time))
-			}
-			if show.start_time > current_time:
-				upcoming_shows.append(show_details)
-			else:
-				past_shows.append(show_details)
+		# past and upcoming shows with their artist columns in two statements
+		past_shows, upcoming_shows = venue_show_timeline(venue_id)
 		data = {**venue.__dict__, 
 				"past_shows": past_shows,
 				"upcoming_shows": upcoming_shows,
@@ -183,47 +164,40 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@page_cache.cached
 def artists():
-	# TODO: replace with real data returned from querying the database
-	data = Artist.query.all()
-	return render_template('pages/artists.html', artists=data)
+	# id/name projection, one page at a time, with an alphabetical jump index
+	after = request.args.get('after')
+	if after:
+		try:
+			after = decode_artist_cursor(after)
+		except ValueError:
+			abort(404)
+	letter = request.args.get('letter', '')[:1].upper()
+	data, next_cursor = artist_page(after=after or None, letter=letter)
+	return render_template('pages/artists.html', artists=data, next_cursor=next_cursor,
+		letters=ARTIST_INDEX_LETTERS, letter=letter)
 
 @app.route('/artists/search', methods=['GET','POST'])
 def search_artists():
 	# TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
 	# seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
 	# search for "band" should return "The Wild Sax Band".
-	search_term = request.form.get('search_term','') 
-	result = Artist.query.filter(Artist.name.ilike(f'%{search_term}%'))
-	response={
-		"count": result.count(),
-		"data": result.all()
-	}
-	return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+	search_term = request.values.get('search_term', '')
+	response = search(Artist, search_term, page=request.values.get('page', 1, type=int))
+	return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
 @app.route('/artists/<int:artist_id>')
+@page_cache.cached
 def show_artist(artist_id):
 	# shows the venue page with the given venue_id
 	# TODO: replace with real venue data from the venues table, using venue_id
 	data = {}
 	artist = Artist.query.get(artist_id)
-	current_time = datetime.now()
 	#venue = 
 	if artist:
-		shows = Show.query.filter_by(artist_id=artist_id)
-		upcoming_shows = []
-		past_shows = []
-		for show in shows:
-			show_details = {
-				"venue_id": show.venue_id,
-				"venue_name": show.venue.name,
-				"venue_image_link": show.venue.image_link,
-				"start_time": format_datetime(str(show.start_time))
-			}
-			if show.start_time > current_time:
-				upcoming_shows.append(show_details)
-			else:
-				past_shows.append(show_details)
+		# past and upcoming shows with their venue columns in two statements
+		past_shows, upcoming_shows = artist_show_timeline(artist_id)
 		data = {**artist.__dict__, 
 				"past_shows": past_shows,
 				"upcoming_shows": upcoming_shows,
@@ -335,23 +309,17 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@page_cache.cached
 def shows():
-	# displays list of shows at /shows
-	# TODO: replace with real venues data.
-	#       num_shows should be aggregated based on number of upcoming shows per venue.
-	data = []
-	shows = Show.query.all()
-	if shows:
-		for show in shows:
-			data.append({
-				"venue_id": show.venue_id,
-				"venue_name": show.venue.name,
-				"artist_id": show.artist_id,
-				"artist_name": show.artist.name,
-				"artist_image_link": show.artist.image_link,
-				"start_time": format_datetime(str(show.start_time))
-				})
-	return render_template('pages/shows.html', shows=data)
+	# displays list of shows at /shows, one keyset page at a time
+	after = request.args.get('after')
+	if after:
+		try:
+			after = decode_show_cursor(after)
+		except ValueError:
+			abort(404)
+	data, next_cursor = show_page(after=after or None)
+	return render_template('pages/shows.html', shows=data, next_cursor=next_cursor)
 
 @app.route('/shows/create', methods=['GET'])
 def create_shows():
@@ -381,6 +349,14 @@ def create_show_submission():
 		db.session.close()
 	return render_template('pages/home.html')
 
+#  Cache
+#  ----------------------------------------------------------------
+
+@app.route('/cache/stats')
+def cache_stats():
+	# hit/miss counters of the rendered page cache
+	return jsonify(page_cache.stats())
+
 @app.errorhandler(404)
 def not_found_error(error):
 		return render_template('errors/404.html'), 404
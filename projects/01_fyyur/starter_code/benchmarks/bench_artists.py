@@ -0,0 +1,63 @@
+#----------------------------------------------------------------------------#
+# /artists memory benchmark.
+#----------------------------------------------------------------------------#
+# Grows the artist table to 1M rows and, at each size, records the Python
+# memory allocated while serving the first directory page, a letter jump and
+# a page deep into the listing. Peak memory per request should stay flat as
+# the table grows, because only one page of (id, name) tuples is loaded.
+
+import tracemalloc
+from urllib.parse import urlencode
+
+from benchmarks.common import CITIES, reset_schema
+from app import app
+from cache import page_cache
+from models import db, Artist
+from queries import encode_artist_cursor
+
+SIZES = [1000, 10000, 100000, 1000000]
+BATCH_SIZE = 10000
+
+
+def grow_artists(start, stop):
+    for batch_start in range(start, stop, BATCH_SIZE):
+        db.session.execute(Artist.__table__.insert(), [{
+            'id': i,
+            'name': f'Artist {i:07d}',
+            'city': CITIES[i % len(CITIES)][0],
+            'state': CITIES[i % len(CITIES)][1],
+            'genres': 'Jazz',
+            'image_link': f'https://example.com/artists/{i}.jpg',
+            'seeking_venue_description': 'x' * 200,
+        } for i in range(batch_start + 1, min(batch_start + BATCH_SIZE, stop) + 1)])
+        db.session.commit()
+
+
+def peak_kib(client, url):
+    page_cache.backend.clear()
+    tracemalloc.start()
+    response = client.get(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.status_code == 200
+    return peak / 1024
+
+
+def main():
+    client = app.test_client()
+    reset_schema()
+    print(f'{"artists":>9} {"first KiB":>10} {"letter KiB":>11} {"deep KiB":>9}')
+    size = 0
+    for target in SIZES:
+        grow_artists(size, target)
+        size = target
+        middle = size // 2
+        deep = '/artists?' + urlencode(
+            {'after': encode_artist_cursor(f'Artist {middle:07d}', middle)})
+        print(f'{size:>9} {peak_kib(client, "/artists"):>10.0f} '
+              f'{peak_kib(client, "/artists?letter=A"):>11.0f} '
+              f'{peak_kib(client, deep):>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#----------------------------------------------------------------------------#
+# datetime filter benchmark.
+#----------------------------------------------------------------------------#
+# Formats the start times of 100k shows with the original filter (str() in
+# the view, dateutil re-parse and Babel pattern parse on every call) and with
+# the cached filter, and reports rows per second for each. Show times are
+# drawn from hourly slots over a year, as listings repeat popular slots.
+
+import random
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from app import format_datetime, _format_datetime
+
+NUM_SHOWS = 100000
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def run(label, func, values):
+    start = time.perf_counter()
+    for value in values:
+        func(value)
+    seconds = time.perf_counter() - start
+    print(f'{label:<28} {len(values) / seconds:>12,.0f} rows/s')
+    return seconds
+
+
+def main():
+    start = datetime(2021, 1, 1, 18, 0)
+    values = [start + timedelta(hours=random.randint(0, 24 * 365))
+              for _ in range(NUM_SHOWS)]
+    for value in values[:100]:
+        assert format_datetime(value, 'full') == \
+            legacy_format_datetime(str(value), 'full')
+
+    _format_datetime.cache_clear()
+    legacy = run('legacy filter', lambda v: legacy_format_datetime(str(v), 'full'), values)
+    cached = run('cached filter', lambda v: format_datetime(v, 'full'), values)
+    print(f'speedup: {legacy / cached:.1f}x, {_format_datetime.cache_info()}')
+
+
+if __name__ == '__main__':
+    main()
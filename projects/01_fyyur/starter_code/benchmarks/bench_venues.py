@@ -0,0 +1,32 @@
+#----------------------------------------------------------------------------#
+# /venues benchmark.
+#----------------------------------------------------------------------------#
+# Renders /venues over catalogs of growing size and reports the number of
+# SQL statements and the wall time per request. The statement count should
+# stay constant as the number of venues grows. The page cache is cleared
+# before each request, seed() bypasses the flush events that invalidate it.
+
+from benchmarks.common import QueryCounter, reset_schema, seed, timed
+from app import app
+from cache import page_cache
+from models import db
+
+SIZES = [10, 100, 1000, 10000]
+
+
+def main():
+    client = app.test_client()
+    print(f'{"venues":>8} {"queries":>8} {"ms":>10}')
+    for size in SIZES:
+        reset_schema()
+        seed(size)
+        page_cache.backend.clear()
+        with QueryCounter(db.engine) as counter, timed() as elapsed:
+            response = client.get('/venues')
+        assert response.status_code == 200
+        assert response.headers.get('X-Cache') != 'HIT'
+        print(f'{size:>8} {counter.count:>8} {elapsed["seconds"] * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#----------------------------------------------------------------------------#
+# Benchmark helpers.
+#----------------------------------------------------------------------------#
+# Benchmarks run against their own database so seeding never touches real
+# data. Point DATABASE_URL at a scratch postgres database before running:
+#
+#   createdb fyyur_bench
+#   DATABASE_URL=postgresql://postgres@localhost:5432/fyyur_bench \
+#       python -m benchmarks.bench_venues
+
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+os.environ.setdefault('DATABASE_URL',
+                      'postgresql://postgres@localhost:5432/fyyur_bench')
+
+from sqlalchemy import event
+
+from models import db, Venue, Artist, Show
+
+CITIES = [
+    ('San Francisco', 'CA'),
+    ('New York', 'NY'),
+    ('Seattle', 'WA'),
+    ('Austin', 'TX'),
+    ('Chicago', 'IL'),
+]
+
+
+class QueryCounter(object):
+    """Counts the SQL statements executed on the engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+@contextmanager
+def timed():
+    """Yields a dict whose ``seconds`` key is filled in on exit."""
+    result = {}
+    start = time.perf_counter()
+    yield result
+    result['seconds'] = time.perf_counter() - start
+
+
+def reset_schema():
+    db.drop_all()
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        db.session.commit()
+    db.create_all()
+
+
+def seed(num_venues, num_artists=None, num_shows=None, batch_size=10000):
+    """Bulk inserts a synthetic catalog; returns (venues, artists, shows)."""
+    num_artists = num_venues if num_artists is None else num_artists
+    num_shows = num_venues * 2 if num_shows is None else num_shows
+    now = datetime.now()
+
+    def insert(model, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                db.session.bulk_insert_mappings(model, batch)
+                batch = []
+        if batch:
+            db.session.bulk_insert_mappings(model, batch)
+        db.session.commit()
+
+    insert(Venue, ({
+        'id': i,
+        'name': f'Venue {i}',
+        'city': CITIES[i % len(CITIES)][0],
+        'state': CITIES[i % len(CITIES)][1],
+        'genres': ['Jazz'],
+        'image_link': f'https://example.com/venues/{i}.jpg',
+    } for i in range(1, num_venues + 1)))
+    insert(Artist, ({
+        'id': i,
+        'name': f'Artist {i}',
+        'city': CITIES[i % len(CITIES)][0],
+        'state': CITIES[i % len(CITIES)][1],
+        'genres': 'Jazz',
+        'image_link': f'https://example.com/artists/{i}.jpg',
+    } for i in range(1, num_artists + 1)))
+    insert(Show, ({
+        'id': i,
+        'venue_id': random.randint(1, num_venues),
+        'artist_id': random.randint(1, num_artists),
+        'start_time': now + timedelta(hours=random.randint(-24 * 365, 24 * 365)),
+    } for i in range(1, num_shows + 1)))
+    return num_venues, num_artists, num_shows
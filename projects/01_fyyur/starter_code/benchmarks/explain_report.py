@@ -0,0 +1,147 @@
+#----------------------------------------------------------------------------#
+# EXPLAIN ANALYZE report.
+#----------------------------------------------------------------------------#
+# Seeds a large catalog (1M shows by default) with generate_series, captures
+# the SQL the Fyyur read pages issue, and runs each statement through
+# EXPLAIN ANALYZE. The report lists every scan in each plan and fails when a
+# query that should be index driven falls back to a sequential scan of Show.
+# PostgreSQL only:
+#
+#   DATABASE_URL=postgresql://postgres@localhost:5432/fyyur_bench \
+#       python -m benchmarks.explain_report --shows 1000000
+
+import argparse
+import json
+import sys
+
+from sqlalchemy import event, text
+
+from benchmarks.common import CITIES, reset_schema
+from models import db
+from queries import venue_areas, venue_show_timeline, artist_show_timeline, \
+    show_page
+
+SEED_VENUES = '''
+INSERT INTO "Venue" (id, name, city, state, genres, image_link)
+SELECT g, 'Venue ' || g,
+       (:cities)[1 + g % :num_cities], (:states)[1 + g % :num_cities],
+       ARRAY['Jazz'], 'https://example.com/venues/' || g || '.jpg'
+FROM generate_series(1, :n) AS g
+'''
+
+SEED_ARTISTS = '''
+INSERT INTO "Artist" (id, name, city, state, genres, image_link)
+SELECT g, 'Artist ' || g,
+       (:cities)[1 + g % :num_cities], (:states)[1 + g % :num_cities],
+       'Jazz', 'https://example.com/artists/' || g || '.jpg'
+FROM generate_series(1, :n) AS g
+'''
+
+SEED_SHOWS = '''
+INSERT INTO "Show" (id, venue_id, artist_id, start_time)
+SELECT g,
+       1 + floor(random() * :venues)::int,
+       1 + floor(random() * :artists)::int,
+       now() + (random() * 730 - 365) * interval '1 day'
+FROM generate_series(1, :n) AS g
+'''
+
+# (label, callable, whether every Show access must go through an index)
+QUERIES = [
+    ('venue areas', lambda: venue_areas(), False),
+    ('venue show timeline', lambda: venue_show_timeline(1), True),
+    ('artist show timeline', lambda: artist_show_timeline(1), True),
+    ('shows first page', lambda: show_page(), True),
+]
+
+
+def seed(venues, artists, shows):
+    params = {
+        'cities': [city for city, _ in CITIES],
+        'states': [state for _, state in CITIES],
+        'num_cities': len(CITIES),
+    }
+    db.session.execute(text(SEED_VENUES), dict(params, n=venues))
+    db.session.execute(text(SEED_ARTISTS), dict(params, n=artists))
+    db.session.execute(text(SEED_SHOWS),
+                       {'venues': venues, 'artists': artists, 'n': shows})
+    db.session.commit()
+    for table in ('Venue', 'Artist', 'Show'):
+        db.session.execute(text(f'ANALYZE "{table}"'))
+    db.session.commit()
+
+
+def capture(func):
+    """Runs ``func`` and returns the (statement, parameters) it executed."""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', on_execute)
+    try:
+        func()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', on_execute)
+    return statements
+
+
+def scans(plan):
+    """Flattens a JSON plan tree into (node type, relation, index) tuples."""
+    found = []
+    if 'Scan' in plan['Node Type']:
+        found.append((plan['Node Type'], plan.get('Relation Name'),
+                      plan.get('Index Name')))
+    for child in plan.get('Plans', []):
+        found.extend(scans(child))
+    return found
+
+
+def explain(statement, parameters):
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + statement,
+                       parameters)
+        plan = cursor.fetchone()[0]
+    finally:
+        connection.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--venues', type=int, default=10000)
+    parser.add_argument('--artists', type=int, default=10000)
+    parser.add_argument('--shows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    if db.engine.dialect.name != 'postgresql':
+        sys.exit('explain_report needs a PostgreSQL DATABASE_URL')
+
+    reset_schema()
+    seed(args.venues, args.artists, args.shows)
+    print(f'seeded {args.venues} venues, {args.artists} artists, '
+          f'{args.shows} shows\n')
+
+    failures = 0
+    for label, func, index_only in QUERIES:
+        for statement, parameters in capture(func):
+            plan = explain(statement, parameters)
+            print(f'{label}: {plan["Execution Time"]:.2f} ms')
+            for node_type, relation, index in scans(plan['Plan']):
+                ok = not (index_only and relation == 'Show'
+                          and node_type == 'Seq Scan')
+                failures += not ok
+                print(f'  {"ok  " if ok else "FAIL"} {node_type} on {relation}'
+                      + (f' using {index}' if index else ''))
+        print()
+
+    if failures:
+        sys.exit(f'{failures} sequential scan(s) of Show where an index was expected')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+# Server-side cache of rendered read pages. Entries expire after CACHE_TTL
+# seconds and the whole cache is invalidated by any commit that touches a
+# Venue, Artist or Show. Backends are pluggable through CACHE_BACKEND:
+#
+#   memory  in-process LRU bounded by CACHE_MAX_ENTRIES (default)
+#   redis   any server speaking the Redis protocol at CACHE_REDIS_URL; only
+#           GET, SET ... PX and INCR are used, so a local stub will do
+
+import socket
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from urllib.parse import urlparse
+
+from flask import request, session
+
+from commit_hooks import on_commit_of
+from models import app, Venue, Artist, Show
+
+CACHED_MODELS = (Venue, Artist, Show)
+
+
+class MemoryCacheBackend(object):
+    """Thread-safe LRU of (expires_at, value) pairs."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend(object):
+    """Minimal Redis protocol client.
+
+    Keys are namespaced by a generation counter, so clearing the cache is a
+    single INCR and stale entries simply age out through their TTL.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', namespace='fyyur:page'):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or 'localhost', parsed.port or 6379)
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.namespace = namespace
+        self._sock = None
+        self._file = None
+        self._lock = Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address)
+        self._file = self._sock.makefile('rb')
+        if self.db:
+            self._send('SELECT', self.db)
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('connection closed by server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest
+        if kind == b'-':
+            raise RuntimeError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length == -1:
+                return None
+            data = self._file.read(length + 2)
+            return data[:-2]
+        raise RuntimeError(f'unexpected reply {line!r}')
+
+    def _send(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            arg = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self._sock.sendall(b''.join(parts))
+        return self._read()
+
+    def _command(self, *args):
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                return self._send(*args)
+            except (OSError, ConnectionError):
+                self._sock = None
+                raise
+
+    def _key(self, key):
+        generation = self._command('GET', f'{self.namespace}:generation') or b'0'
+        return f'{self.namespace}:{generation.decode()}:{key}'
+
+    def get(self, key):
+        value = self._command('GET', self._key(key))
+        return value.decode() if value is not None else None
+
+    def set(self, key, value, ttl):
+        self._command('SET', self._key(key), value, 'PX', int(ttl * 1000))
+
+    def clear(self):
+        self._command('INCR', f'{self.namespace}:generation')
+
+
+class PageCache(object):
+
+    def __init__(self, backend, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+    def invalidate(self):
+        self.invalidations += 1
+        try:
+            self.backend.clear()
+        except (OSError, RuntimeError):
+            app.logger.exception('page cache invalidation failed')
+
+    def cached(self, view):
+        """Caches a view's rendered HTML under the request path and query.
+
+        Requests with pending flash messages bypass the cache, as the layout
+        renders (and consumes) them.
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or '_flashes' in session:
+                return view(*args, **kwargs)
+            key = request.full_path
+            try:
+                body = self.backend.get(key)
+            except (OSError, RuntimeError):
+                app.logger.exception('page cache read failed')
+                return view(*args, **kwargs)
+            if body is not None:
+                self.hits += 1
+                return body, 200, {'X-Cache': 'HIT'}
+            self.misses += 1
+            body = view(*args, **kwargs)
+            if not isinstance(body, str):
+                return body
+            try:
+                self.backend.set(key, body, self.ttl)
+            except (OSError, RuntimeError):
+                app.logger.exception('page cache write failed')
+            return body, 200, {'X-Cache': 'MISS'}
+        return wrapper
+
+
+def _create_backend():
+    if app.config.get('CACHE_BACKEND') == 'redis':
+        return RedisCacheBackend(app.config.get('CACHE_REDIS_URL') or
+                                 'redis://localhost:6379/0')
+    return MemoryCacheBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+
+
+page_cache = PageCache(_create_backend(), ttl=app.config.get('CACHE_TTL', 60))
+
+
+def _invalidate_page_cache(written):
+    page_cache.invalidate()
+
+
+on_commit_of(CACHED_MODELS, _invalidate_page_cache)
@@ -0,0 +1,43 @@
+#----------------------------------------------------------------------------#
+# Commit hooks.
+#----------------------------------------------------------------------------#
+# One set of session listeners for everything that caches model data in
+# process. Writes are collected at every flush, forgotten on rollback, and
+# handed to the registered callbacks once the commit succeeds, so caches are
+# only invalidated by data other sessions can actually see.
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# (models, callback) in registration order
+_hooks = []
+
+
+def on_commit_of(models, callback):
+    """Calls ``callback(written)`` once a commit that wrote instances of
+    any of ``models`` succeeds, with the set of those models it wrote."""
+    _hooks.append((tuple(models), callback))
+    return callback
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_writes(session, flush_context):
+    written = session.info.setdefault('written_models', set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        written.add(type(instance))
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_hooks(session):
+    written = session.info.pop('written_models', None)
+    if not written:
+        return
+    for models, callback in _hooks:
+        matched = {model for model in models if model in written}
+        if matched:
+            callback(matched)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_writes(session):
+    session.info.pop('written_models', None)
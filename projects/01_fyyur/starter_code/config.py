@@ -9,7 +9,18 @@ DEBUG = True
 # Connect to the database
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://postgres@localhost:5432/fyyur'
+SQLALCHEMY_DATABASE_URI = os.environ.get(
+    'DATABASE_URL', 'postgresql://postgres@localhost:5432/fyyur')
 
 # remove console warning
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Venue/artist search backend: 'trigram' (PostgreSQL pg_trgm) or 'memory'.
+# Left unset, it follows the database dialect.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND')
+
+# Rendered page cache: 'memory' (in-process LRU) or 'redis'.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+CACHE_TTL = 60
+CACHE_MAX_ENTRIES = 1024
@@ -1,7 +1,8 @@
+import re
 from datetime import datetime
 from flask_wtf import Form
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms.validators import DataRequired, AnyOf, URL, Optional
 from wtforms import ValidationError
 from itertools import chain
 
@@ -83,11 +84,11 @@ STATE_CHOICES = [
 
 class VenueForm(Form):
     def validate_phone(form, field):
-        if not re.search(r"^[0-9]{3}-[0-9]{3}-[0-9]{4}$", field.data):
+        if field.data and not re.search(r"^[0-9]{3}-[0-9]{3}-[0-9]{4}$", field.data):
             raise ValidationError("Invalid Phone Number")
     def validate_genres(form, field):
         for value in field.data:
-            if value in chain(*GENRE_CHOICES):
+            if value not in chain(*GENRE_CHOICES):
                 raise ValidationError("Invalid Genre")
 
     name = StringField(
@@ -115,10 +116,10 @@ class VenueForm(Form):
         choices= GENRE_CHOICES
     )
     facebook_link = StringField(
-        'facebook_link', validators=[URL()]
+        'facebook_link', validators=[Optional(), URL()]
     )
     website = StringField(
-        'website', validators=[URL()]
+        'website', validators=[Optional(), URL()]
     )
     seeking_talent = BooleanField('seeking_talent')
     seeking_talent_description = StringField(
@@ -128,11 +129,11 @@ class VenueForm(Form):
 class ArtistForm(Form):
 
     def validate_phone(form, field):
-        if not re.search(r"^[0-9]{3}-[0-9]{3}-[0-9]{4}$", field.data):
+        if field.data and not re.search(r"^[0-9]{3}-[0-9]{3}-[0-9]{4}$", field.data):
             raise ValidationError("Invalid Phone Number")
     def validate_genres(form, field):
         for value in field.data:
-            if value in chain(*GENRE_CHOICES):
+            if value not in chain(*GENRE_CHOICES):
                 raise ValidationError("Invalid Genre")
     name = StringField('name', validators=[DataRequired()]
     )
@@ -157,10 +158,10 @@ class ArtistForm(Form):
         choices=GENRE_CHOICES
     )
     facebook_link = StringField(
-        'facebook_link', validators=[URL()]
+        'facebook_link', validators=[Optional(), URL()]
     )
     website = StringField(
-        'website', validators=[URL()]
+        'website', validators=[Optional(), URL()]
     )
     seeking_venue = BooleanField('seeking_venue')
     seeking_venue_description = StringField(
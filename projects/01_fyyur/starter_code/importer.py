@@ -0,0 +1,321 @@
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+# `flask import <venues|artists|shows> <file>` streams a CSV or JSON Lines
+# file in batches, validates every row with the same rules as the
+# VenueForm/ArtistForm/ShowForm web forms, and inserts each batch in its own
+# transaction with a single executemany (or COPY on PostgreSQL).
+#
+# After each committed batch the number of consumed rows is written to a
+# checkpoint file next to the input; rerunning the same command after a
+# failure skips what was already committed. Invalid rows, lines that are not
+# JSON, shows of venues or artists that do not exist, and rows the database
+# rejects are reported and skipped, they never abort the import. A batch
+# the database rejects is inserted again row by row, each in a savepoint,
+# so only its offending rows are skipped.
+#
+# The checkpoint is written after the batch commits, so a process killed
+# between the two inserts that batch again on resume: rows with an `id`
+# are then rejected as duplicates, rows without one are duplicated.
+
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+import click
+from sqlalchemy.exc import DataError, IntegrityError
+from werkzeug.datastructures import MultiDict
+
+from cache import page_cache
+from forms import VenueForm, ArtistForm, ShowForm
+from models import app, db, Venue, Artist, Show
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 50
+
+
+def _genres(value):
+    if isinstance(value, str):
+        return [genre.strip() for genre in value.split(',') if genre.strip()]
+    return list(value or [])
+
+
+def _venue_row(data):
+    return dict(data)
+
+
+def _artist_row(data):
+    return dict(data, genres=','.join(data['genres']))
+
+
+def _show_row(data):
+    return {
+        'artist_id': int(data['artist_id']),
+        'venue_id': int(data['venue_id']),
+        'start_time': data['start_time'],
+    }
+
+
+# kind -> (model, form, boolean fields, form data to column values,
+#          keys every row must carry, as form defaults would fill them in)
+IMPORTERS = {
+    'venues': (Venue, VenueForm, ('seeking_talent',), _venue_row, ()),
+    'artists': (Artist, ArtistForm, ('seeking_venue',), _artist_row, ()),
+    'shows': (Show, ShowForm, (), _show_row,
+              ('artist_id', 'venue_id', 'start_time')),
+}
+
+# kind -> {column: model it references}, checked against the database
+REFERENCES = {
+    'shows': {'artist_id': Artist, 'venue_id': Venue},
+}
+
+
+def read_rows(path):
+    """Yields (row, None) for each row of a CSV or JSON Lines file, or
+    (None, errors) for a line that is not valid JSON, lazily."""
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                yield row, None
+    else:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line), None
+                    except ValueError as e:
+                        yield None, {'row': [f'invalid JSON: {e}']}
+
+
+def validate_row(kind, row):
+    """Returns (column values, None) for a valid row or (None, errors)."""
+    model, form_class, booleans, to_columns, required = IMPORTERS[kind]
+    if not isinstance(row, dict):
+        return None, {'row': ['expected a JSON object']}
+    missing = [key for key in required
+               if row.get(key) is None or not str(row[key]).strip()]
+    if missing:
+        return None, {key: ['This field is required.'] for key in missing}
+    formdata = MultiDict()
+    for key, value in row.items():
+        if key == 'genres':
+            formdata.setlist(key, _genres(value))
+        elif key in booleans:
+            value = str(value).strip().lower()
+            formdata[key] = 'y' if value in ('y', 'yes', 'true', '1') else 'false'
+        elif value is not None:
+            formdata[key] = str(value)
+    form = form_class(formdata=formdata, meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+    data = {name: field.data for name, field in form._fields.items()
+            if name in model.__table__.columns}
+    try:
+        values = to_columns(data)
+        if row.get('id'):
+            values['id'] = int(row['id'])
+    except (TypeError, ValueError) as e:
+        return None, {'row': [str(e)]}
+    return values, None
+
+
+def missing_references(kind, rows):
+    """Returns {row index: errors} for rows referencing missing records."""
+    errors = {}
+    for column, model in REFERENCES.get(kind, {}).items():
+        ids = {row[column] for row in rows}
+        found = {id for id, in db.session.query(model.id)
+                 .filter(model.id.in_(ids))}
+        for index, row in enumerate(rows):
+            if row[column] not in found:
+                errors.setdefault(index, {})[column] = [
+                    f'no {model.__tablename__} with id {row[column]}']
+    return errors
+
+
+def _pg_array(values):
+    return '{' + ','.join(
+        '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+        for value in values) + '}'
+
+
+def copy_rows(model, rows):
+    """Streams a batch into PostgreSQL with COPY ... FROM STDIN."""
+    columns = list(rows[0].keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            _pg_array(value) if isinstance(value, list) else
+            ('' if value is None else value)
+            for value in (row.get(column) for column in columns)])
+    buffer.seek(0)
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        f'COPY "{model.__tablename__}" ({column_list}) FROM STDIN WITH CSV',
+        buffer)
+
+
+def insert_rows(model, rows, method):
+    # one statement per column set, rows with an explicit id and rows
+    # without one cannot share an executemany or a COPY column list
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(row), []).append(row)
+    for group in groups.values():
+        if method == 'copy':
+            copy_rows(model, group)
+        else:
+            db.session.execute(model.__table__.insert(), group)
+
+
+def insert_each(model, rows, method, rejected_errors):
+    """Inserts rows one at a time, each in a savepoint, and returns
+    {row index: errors} for the rows the database rejects."""
+    rejected = {}
+    for index, row in enumerate(rows):
+        try:
+            with db.session.begin_nested():
+                insert_rows(model, [row], method)
+        except rejected_errors as e:
+            error = getattr(e, 'orig', e).__class__.__name__
+            rejected[index] = {'row': [f'rejected by the database: {error}']}
+    return rejected
+
+
+class Checkpoint(object):
+    """Number of input rows already committed, persisted next to the input."""
+
+    def __init__(self, path, kind):
+        self.path = path
+        self.kind = kind
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            state = json.load(f)
+        if state.get('kind') != self.kind:
+            raise click.ClickException(
+                f'{self.path} is a checkpoint for {state.get("kind")}, '
+                f'not {self.kind}; use --restart to ignore it')
+        return state['rows']
+
+    def save(self, rows):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'kind': self.kind, 'rows': rows}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def import_file(kind, path, batch_size=IMPORT_BATCH_SIZE, method='executemany',
+                checkpoint=None, echo=click.echo):
+    """Imports ``path`` and returns (inserted, invalid) row counts."""
+    model = IMPORTERS[kind][0]
+    checkpoint = checkpoint or Checkpoint(path + '.checkpoint', kind)
+    done = checkpoint.load()
+    if done:
+        echo(f'resuming after row {done} from {checkpoint.path}')
+
+    rows = islice(read_rows(path), done, None)
+    inserted = invalid = 0
+    # COPY goes through the raw DB-API cursor, its errors are not wrapped
+    dbapi = db.engine.dialect.dbapi
+    rejected_errors = (IntegrityError, DataError,
+                       dbapi.IntegrityError, dbapi.DataError)
+
+    def reject(number, errors):
+        nonlocal invalid
+        invalid += 1
+        if invalid <= MAX_REPORTED_ERRORS:
+            echo(f'row {number}: {errors}', err=True)
+
+    start = time.perf_counter()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        values = []
+        numbers = []
+        for number, (row, errors) in enumerate(batch, start=done + 1):
+            if errors is None:
+                row_values, errors = validate_row(kind, row)
+            if errors:
+                reject(number, errors)
+                continue
+            values.append(row_values)
+            numbers.append(number)
+        if values:
+            missing = missing_references(kind, values)
+            for index in sorted(missing):
+                reject(numbers[index], missing[index])
+            values = [row for index, row in enumerate(values)
+                      if index not in missing]
+            numbers = [number for index, number in enumerate(numbers)
+                       if index not in missing]
+        if values:
+            try:
+                try:
+                    insert_rows(model, values, method)
+                except rejected_errors:
+                    # the database rejected the batch, e.g. over a duplicate
+                    # id; insert it again row by row so only the offending
+                    # rows are reported and the others are not lost
+                    db.session.rollback()
+                    rejected = insert_each(model, values, method,
+                                           rejected_errors)
+                    for index in sorted(rejected):
+                        reject(numbers[index], rejected[index])
+                    values = [row for index, row in enumerate(values)
+                              if index not in rejected]
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                echo(f'batch after row {done} failed; rerun to resume', err=True)
+                raise
+        done += len(batch)
+        inserted += len(values)
+        checkpoint.save(done)
+        elapsed = time.perf_counter() - start
+        echo(f'{done} rows read, {inserted} inserted, '
+             f'{inserted / elapsed:,.0f} rows/s')
+
+    checkpoint.clear()
+    if inserted:
+        # core inserts bypass the ORM flush events that normally do this
+        page_cache.invalidate()
+    return inserted, invalid
+
+
+@app.cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True,
+              help='Rows validated and committed per transaction.')
+@click.option('--method', type=click.Choice(['executemany', 'copy']),
+              default='executemany', show_default=True,
+              help='COPY is PostgreSQL only.')
+@click.option('--restart', is_flag=True,
+              help='Ignore an existing checkpoint and start from the top.')
+def import_command(kind, path, batch_size, method, restart):
+    """Bulk import venues, artists or shows from CSV or JSON Lines."""
+    if method == 'copy' and db.engine.dialect.name != 'postgresql':
+        raise click.ClickException('--method copy needs PostgreSQL')
+    checkpoint = Checkpoint(path + '.checkpoint', kind)
+    if restart:
+        checkpoint.clear()
+    start = time.perf_counter()
+    inserted, invalid = import_file(kind, path, batch_size=batch_size,
+                                    method=method, checkpoint=checkpoint)
+    elapsed = time.perf_counter() - start
+    click.echo(f'imported {inserted} {kind} ({invalid} invalid) in '
+               f'{elapsed:.1f}s, {inserted / elapsed if elapsed else 0:,.0f} rows/s')
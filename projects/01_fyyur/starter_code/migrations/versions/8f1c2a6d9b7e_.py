@@ -0,0 +1,24 @@
+"""add Show (start_time, id) index for keyset pagination
+
+Revision ID: 8f1c2a6d9b7e
+Revises: 5d2d5d1a47e3
+Create Date: 2021-01-09 18:42:10.214630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f1c2a6d9b7e'
+down_revision = '5d2d5d1a47e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_start_time_id', table_name='Show')
@@ -0,0 +1,24 @@
+"""add Artist (name, id) index for the paginated directory
+
+Revision ID: e25b8c4a7f31
+Revises: d7a93e5f0c12
+Create Date: 2021-01-16 16:48:02.377915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e25b8c4a7f31'
+down_revision = 'd7a93e5f0c12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Artist_name_id', 'Artist', ['name', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Artist_name_id', table_name='Artist')
@@ -0,0 +1,187 @@
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+# Read-side helpers for the Fyyur views. Each helper issues a fixed number of
+# SQL statements regardless of how many rows it returns, so the page cost
+# does not grow with the size of the catalog.
+
+import base64
+import json
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import and_, func, tuple_
+
+from models import db, Venue, Artist, Show
+
+SHOWS_PER_PAGE = 30
+ARTISTS_PER_PAGE = 50
+ARTIST_INDEX_LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def venue_areas(current_time=None):
+    """Venues grouped by city and state with their upcoming show counts.
+
+    Venues are left joined to their upcoming shows and counted in a single
+    grouped query; rows come back ordered by area so they can be folded into
+    the ``areas`` structure expected by ``pages/venues.html`` in one pass.
+    """
+    current_time = current_time or datetime.now()
+    rows = db.session.query(
+        Venue.city,
+        Venue.state,
+        Venue.id,
+        Venue.name,
+        func.count(Show.id).label('num_upcoming_shows')
+    ).outerjoin(Show, and_(Show.venue_id == Venue.id,
+                           Show.start_time > current_time)) \
+        .group_by(Venue.city, Venue.state, Venue.id, Venue.name) \
+        .order_by(Venue.state, Venue.city, Venue.id) \
+        .all()
+
+    areas = []
+    for (city, state), venues in groupby(rows, key=lambda row: (row.city, row.state)):
+        areas.append({
+            "city": city,
+            "state": state,
+            "venues": [{
+                "id": venue.id,
+                "name": venue.name,
+                "num_upcoming_shows": venue.num_upcoming_shows
+            } for venue in venues]
+        })
+    return areas
+
+
+def _show_timeline(criterion, model, prefix, current_time):
+    """Past and upcoming shows matching ``criterion`` joined to ``model``.
+
+    The split happens in SQL: one statement selects shows at or before
+    ``current_time`` and one selects shows after it, each projecting only
+    the columns of the joined venue or artist the detail page renders.
+    """
+    query = db.session.query(
+        getattr(Show, prefix + '_id'),
+        model.name,
+        model.image_link,
+        Show.start_time
+    ).join(model, getattr(Show, prefix + '_id') == model.id).filter(criterion)
+
+    def serialize(rows):
+        return [{
+            prefix + "_id": row[0],
+            prefix + "_name": row.name,
+            prefix + "_image_link": row.image_link,
+            "start_time": row.start_time
+        } for row in rows]
+
+    upcoming_shows = serialize(query.filter(Show.start_time > current_time)
+                               .order_by(Show.start_time.asc()))
+    past_shows = serialize(query.filter(Show.start_time <= current_time)
+                           .order_by(Show.start_time.desc()))
+    return past_shows, upcoming_shows
+
+
+def venue_show_timeline(venue_id, current_time=None):
+    """Past and upcoming shows at a venue with their artist details."""
+    return _show_timeline(Show.venue_id == venue_id, Artist, 'artist',
+                          current_time or datetime.now())
+
+
+def artist_show_timeline(artist_id, current_time=None):
+    """Past and upcoming shows of an artist with their venue details."""
+    return _show_timeline(Show.artist_id == artist_id, Venue, 'venue',
+                          current_time or datetime.now())
+
+
+def encode_show_cursor(start_time, show_id):
+    """Opaque keyset cursor pointing just past the given show."""
+    return f'{start_time.isoformat()}_{show_id}'
+
+
+def decode_show_cursor(cursor):
+    """Inverse of ``encode_show_cursor``; raises ValueError when malformed."""
+    start_time, show_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(start_time), int(show_id)
+
+
+def show_page(after=None, per_page=SHOWS_PER_PAGE):
+    """One page of shows ordered by (start_time, id) and the next cursor.
+
+    Pages are addressed by keyset rather than offset: the cursor holds the
+    (start_time, id) of the last show on the previous page, so every page is
+    a range scan on the composite ``ix_Show_start_time_id`` index that costs
+    O(per_page) however deep the listing goes. One extra row is fetched to
+    tell whether a next page exists.
+    """
+    query = db.session.query(
+        Show.id,
+        Show.start_time,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id) \
+        .join(Artist, Show.artist_id == Artist.id)
+    if after is not None:
+        query = query.filter(tuple_(Show.start_time, Show.id) > tuple_(*after))
+    rows = query.order_by(Show.start_time, Show.id).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_show_cursor(rows[-1].start_time, rows[-1].id)
+    shows = [{
+        "venue_id": row.venue_id,
+        "venue_name": row.venue_name,
+        "artist_id": row.artist_id,
+        "artist_name": row.artist_name,
+        "artist_image_link": row.artist_image_link,
+        "start_time": row.start_time
+    } for row in rows]
+    return shows, next_cursor
+
+
+def encode_artist_cursor(name, artist_id):
+    """Opaque keyset cursor pointing just past the given artist: the
+    URL-safe base64 of the JSON ``[name, id]`` pair, without padding."""
+    data = json.dumps([name, artist_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def decode_artist_cursor(cursor):
+    """Inverse of ``encode_artist_cursor``; raises ValueError when malformed."""
+    data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    pair = json.loads(data)
+    if not (isinstance(pair, list) and len(pair) == 2 and
+            isinstance(pair[0], str) and type(pair[1]) is int):
+        raise ValueError(f'malformed artist cursor {cursor!r}')
+    return pair[0], pair[1]
+
+
+def artist_page(after=None, letter=None, per_page=ARTISTS_PER_PAGE):
+    """One page of artist ids and names in (name, id) order.
+
+    Only the two columns the directory renders are selected, so no Artist
+    entities are hydrated. ``after`` is the decoded (name, id) cursor of the
+    last artist on the previous page, so the page still resolves when that
+    artist has since been deleted, and ``letter`` jumps to the first name at
+    or after it; both resolve to a range scan on ``ix_Artist_name_id``.
+    Artists without a name are left out, as NULL sorts differently across
+    databases and compares to no cursor. Returns the rows and the cursor to
+    continue after, or None on the last page.
+    """
+    query = db.session.query(Artist.id, Artist.name) \
+        .filter(Artist.name.isnot(None))
+    if after is not None:
+        query = query.filter(tuple_(Artist.name, Artist.id) > tuple_(*after))
+    elif letter:
+        query = query.filter(Artist.name >= letter)
+    rows = query.order_by(Artist.name, Artist.id).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_artist_cursor(rows[-1].name, rows[-1].id)
+    return [{"id": row.id, "name": row.name} for row in rows], next_cursor
@@ -0,0 +1,133 @@
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+# Name search for venues and artists. Backends are pluggable and return the
+# total number of matches together with one page of ranked results:
+#
+#   trigram  PostgreSQL, served by the pg_trgm GIN indexes on Venue.name and
+#            Artist.name; the total comes from a window count so the page and
+#            the total are fetched by a single statement.
+#   memory   an in-process trigram index for SQLite test runs, rebuilt
+#            lazily after a commit touches the searched model.
+#
+# The backend is picked by the SEARCH_BACKEND config key, falling back to
+# ``trigram`` on PostgreSQL and ``memory`` everywhere else.
+
+from collections import defaultdict
+
+from sqlalchemy import func
+
+from commit_hooks import on_commit_of
+from models import app, db, Venue, Artist
+
+SEARCH_RESULTS_PER_PAGE = 20
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramSearchBackend(object):
+    """Ranked substring search backed by pg_trgm."""
+
+    def search(self, model, term, limit=SEARCH_RESULTS_PER_PAGE, offset=0):
+        rows = db.session.query(
+            model.id,
+            model.name,
+            func.count().over().label('total')
+        ).filter(model.name.ilike(f'%{_escape_like(term)}%', escape='\\')) \
+            .order_by(func.similarity(model.name, term).desc(), model.name, model.id) \
+            .limit(limit) \
+            .offset(offset) \
+            .all()
+        if not rows and offset:
+            # the window count is only visible on returned rows
+            total = db.session.query(func.count(model.id)).filter(
+                model.name.ilike(f'%{_escape_like(term)}%', escape='\\')).scalar()
+        else:
+            total = rows[0].total if rows else 0
+        return total, [{"id": row.id, "name": row.name} for row in rows]
+
+
+class InMemorySearchBackend(object):
+    """Trigram inverted index over names, kept in process.
+
+    Posting lists map each lower-cased trigram to the ids whose name contains
+    it; a search intersects the lists for the term's trigrams and confirms
+    the substring on the survivors. Indexes are dropped once a commit that
+    touched their model succeeds and rebuilt on the next search; dropping
+    them at flush would let another request rebuild from the rows committed
+    before the write.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        on_commit_of((Venue, Artist), self._invalidate)
+
+    def _invalidate(self, written):
+        for model in written:
+            self._indexes.pop(model, None)
+
+    def _index(self, model):
+        if model not in self._indexes:
+            names = dict(db.session.query(model.id, model.name))
+            postings = defaultdict(set)
+            for id, name in names.items():
+                for trigram in _trigrams(name or ''):
+                    postings[trigram].add(id)
+            self._indexes[model] = names, postings
+        return self._indexes[model]
+
+    def search(self, model, term, limit=SEARCH_RESULTS_PER_PAGE, offset=0):
+        names, postings = self._index(model)
+        needle = term.lower()
+        term_trigrams = _trigrams(needle)
+        if term_trigrams:
+            candidates = set.intersection(
+                *(postings.get(trigram, set()) for trigram in term_trigrams))
+        else:
+            candidates = names.keys()
+        matches = [id for id in candidates
+                   if needle in (names[id] or '').lower()]
+
+        def rank(id):
+            name_trigrams = _trigrams(names[id] or '')
+            union = term_trigrams | name_trigrams
+            similarity = len(term_trigrams & name_trigrams) / len(union) if union else 0
+            return -similarity, names[id] or '', id
+
+        matches.sort(key=rank)
+        return len(matches), [{"id": id, "name": names[id]}
+                              for id in matches[offset:offset + limit]]
+
+
+SEARCH_BACKENDS = {
+    'trigram': TrigramSearchBackend,
+    'memory': InMemorySearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        name = app.config.get('SEARCH_BACKEND') or \
+            ('trigram' if db.engine.dialect.name == 'postgresql' else 'memory')
+        _backend = SEARCH_BACKENDS[name]()
+    return _backend
+
+
+def search(model, term, page=1, per_page=SEARCH_RESULTS_PER_PAGE):
+    """Returns the ``count``/``data`` dict the search templates render,
+    with the ``page`` shown and the number of ``pages`` for the pager."""
+    page = max(page, 1)
+    total, data = get_search_backend().search(
+        model, term, limit=per_page, offset=(page - 1) * per_page)
+    return {"count": total, "data": data, "page": page,
+            "pages": (total + per_page - 1) // per_page}
@@ -0,0 +1,68 @@
+"""Benchmark of GET /categories/<id>/questions.
+
+Seeds 100 categories and 100k questions, then times the first and the last
+page of a category listing, with and without the (category, id) index, and
+compares them with the previous approach of loading the whole category
+before slicing out the page.
+"""
+from benchmarks.common import QueryCounter, create_app, grow_questions, \
+    reset_schema, timed
+from flaskr import QUESTIONS_PER_PAGE
+from models import db, Question
+
+NUM_CATEGORIES = 100
+NUM_QUESTIONS = 100000
+CATEGORY_ID = 42
+RUNS = 20
+INDEX = next(index for index in Question.__table__.indexes
+             if index.name == 'ix_questions_category_id')
+
+
+def legacy_page(category_id, page):
+    selection = Question.query.filter_by(category=category_id) \
+        .order_by(Question.id).all()
+    questions = [question.format() for question in selection]
+    start = (page - 1) * QUESTIONS_PER_PAGE
+    return questions[start:start + QUESTIONS_PER_PAGE], len(selection)
+
+
+def time_page(client, page):
+    with QueryCounter(db.engine) as counter, timed() as elapsed:
+        for _ in range(RUNS):
+            response = client.get(
+                f'/categories/{CATEGORY_ID}/questions?page={page}')
+            assert response.status_code == 200
+    return counter.count // RUNS, elapsed['seconds'] * 1000 / RUNS
+
+
+def main():
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        reset_schema([f'Category {i}' for i in range(1, NUM_CATEGORIES + 1)])
+        grow_questions(0, NUM_QUESTIONS, num_categories=NUM_CATEGORIES)
+        db.session.execute('ANALYZE')
+        db.session.commit()
+        in_category = Question.query.filter_by(category=CATEGORY_ID).count()
+    last_page = (in_category - 1) // QUESTIONS_PER_PAGE + 1
+
+    print(f'{NUM_QUESTIONS} questions in {NUM_CATEGORIES} categories, '
+          f'{in_category} in category {CATEGORY_ID}, mean of {RUNS} runs')
+    print(f'{"page":>6} {"queries":>8} {"ms":>8} {"no index ms":>12} '
+          f'{"legacy ms":>10}')
+    for page in (1, last_page):
+        with app.app_context():
+            queries, indexed_ms = time_page(client, page)
+            INDEX.drop(db.engine)
+            _, unindexed_ms = time_page(client, page)
+            INDEX.create(db.engine)
+            with timed() as legacy_elapsed:
+                for _ in range(RUNS):
+                    legacy_page(CATEGORY_ID, page)
+        print(f'{page:>6} {queries:>8} {indexed_ms:>8.2f} '
+              f'{unindexed_ms:>12.2f} '
+              f'{legacy_elapsed["seconds"] * 1000 / RUNS:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
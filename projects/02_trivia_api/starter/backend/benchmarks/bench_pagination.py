@@ -0,0 +1,51 @@
+"""Benchmark of GET /questions as the question bank grows to 1M rows.
+
+For each size it times the first page and a page deep into the listing, and
+compares them with the previous approach of loading and formatting every
+question before slicing out the page.
+"""
+from benchmarks.common import QueryCounter, create_app, grow_questions, \
+    reset_schema, timed
+from flaskr import QUESTIONS_PER_PAGE
+from models import db, Question
+
+SIZES = [1000, 10000, 100000, 1000000]
+# the full-table approach is skipped past this size
+LEGACY_LIMIT = 100000
+
+
+def legacy_page(page):
+    selection = Question.query.order_by(Question.id).all()
+    questions = [question.format() for question in selection]
+    start = (page - 1) * QUESTIONS_PER_PAGE
+    return questions[start:start + QUESTIONS_PER_PAGE], len(selection)
+
+
+def main():
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        reset_schema()
+    print(f'{"questions":>10} {"page":>6} {"queries":>8} {"ms":>9} '
+          f'{"legacy ms":>10}')
+    size = 0
+    for target in SIZES:
+        with app.app_context():
+            grow_questions(size, target)
+        size = target
+        for page in (1, size // QUESTIONS_PER_PAGE // 2):
+            with app.app_context():
+                with QueryCounter(db.engine) as counter, timed() as elapsed:
+                    response = client.get(f'/questions?page={page}')
+                assert response.status_code == 200
+                legacy = '-'
+                if size <= LEGACY_LIMIT:
+                    with timed() as legacy_elapsed:
+                        legacy_page(page)
+                    legacy = f'{legacy_elapsed["seconds"] * 1000:.1f}'
+            print(f'{size:>10} {page:>6} {counter.count:>8} '
+                  f'{elapsed["seconds"] * 1000:>9.1f} {legacy:>10}')
+
+
+if __name__ == '__main__':
+    main()
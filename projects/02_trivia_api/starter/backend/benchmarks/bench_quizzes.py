@@ -0,0 +1,62 @@
+"""Load test of POST /quizzes.
+
+Plays many quizzes against a large question bank, feeding every answered
+question back in previous_questions, and reports the p50 and p99 latency
+of each quiz step. Latency should stay flat from the first step to the
+last even though the exclusion list keeps growing.
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import CATEGORIES, create_app, grow_questions, \
+    reset_schema, timed
+
+NUM_QUESTIONS = 1000000
+NUM_QUIZZES = 200
+QUIZ_LENGTH = 50
+WORKERS = 8
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def play(app):
+    client = app.test_client()
+    category_id = random.choice([0] + list(range(1, len(CATEGORIES) + 1)))
+    previous_questions = []
+    latencies = []
+    for _ in range(QUIZ_LENGTH):
+        with timed() as elapsed:
+            response = client.post('/quizzes', json={
+                'previous_questions': previous_questions,
+                'quiz_category': {'id': category_id}
+            })
+        assert response.status_code == 200
+        latencies.append(elapsed['seconds'] * 1000)
+        previous_questions.append(response.get_json()['question']['id'])
+    return latencies
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        reset_schema()
+        grow_questions(0, NUM_QUESTIONS)
+
+    with ThreadPoolExecutor(WORKERS) as pool:
+        quizzes = list(pool.map(lambda _: play(app), range(NUM_QUIZZES)))
+
+    print(f'{NUM_QUIZZES} quizzes of {QUIZ_LENGTH} steps over '
+          f'{NUM_QUESTIONS} questions, {WORKERS} workers')
+    print(f'{"step":>5} {"p50 ms":>8} {"p99 ms":>8}')
+    for step in range(QUIZ_LENGTH):
+        latencies = [quiz[step] for quiz in quizzes]
+        if step in (0, 9, 24, QUIZ_LENGTH - 1):
+            print(f'{step + 1:>5} {percentile(latencies, 0.5):>8.2f} '
+                  f'{percentile(latencies, 0.99):>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
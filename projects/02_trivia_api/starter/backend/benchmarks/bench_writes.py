@@ -0,0 +1,71 @@
+"""Benchmark of question writes as the question bank grows.
+
+Creates and then deletes a run of questions through the API at each size
+and reports writes per second, next to the previous approach where every
+write re-read and formatted the whole table to echo a page back.
+"""
+from benchmarks.common import QueryCounter, create_app, grow_questions, \
+    reset_schema, timed
+from flaskr import QUESTIONS_PER_PAGE
+from models import db, Question
+
+SIZES = [1000, 10000, 100000]
+WRITES = 200
+
+
+def legacy_write(question=None):
+    """ The old create/delete: write, then load everything for a page"""
+    if question is None:
+        question = Question(question='Legacy benchmark question?',
+                            answer='Legacy answer', category=1, difficulty=1)
+        question.insert()
+    else:
+        question.delete()
+    selection = Question.query.order_by(Question.id).all()
+    questions = [question.format() for question in selection]
+    return question, questions[:QUESTIONS_PER_PAGE], len(selection)
+
+
+def run_api(client):
+    created = []
+    for _ in range(WRITES):
+        response = client.post('/questions', json={
+            'question': 'Benchmark write?', 'answer': 'Write',
+            'category': 1, 'difficulty': 1})
+        assert response.status_code == 200
+        created.append(response.get_json()['created'])
+    for question_id in created:
+        response = client.delete(f'/questions/{question_id}')
+        assert response.status_code == 200
+
+
+def run_legacy():
+    created = [legacy_write()[0] for _ in range(WRITES)]
+    for question in created:
+        legacy_write(question)
+
+
+def main():
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        reset_schema()
+    print(f'{WRITES} creates + {WRITES} deletes per size')
+    print(f'{"questions":>10} {"queries/write":>14} {"writes/s":>9} '
+          f'{"legacy writes/s":>16}')
+    size = 0
+    for target in SIZES:
+        with app.app_context():
+            grow_questions(size, target)
+            with QueryCounter(db.engine) as counter, timed() as elapsed:
+                run_api(client)
+            with timed() as legacy_elapsed:
+                run_legacy()
+        size = target
+        print(f'{size:>10} {counter.count / (2 * WRITES):>14.1f} '
+              f'{2 * WRITES / elapsed["seconds"]:>9.0f} '
+              f'{2 * WRITES / legacy_elapsed["seconds"]:>16.0f}')
+
+
+if __name__ == '__main__':
+    main()
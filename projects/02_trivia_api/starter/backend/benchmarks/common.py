@@ -0,0 +1,77 @@
+"""Shared helpers for the trivia benchmarks.
+
+Benchmarks reseed their own database, so they default to DB_NAME=trivia_bench
+instead of the development database:
+
+    createdb trivia_bench
+    python -m benchmarks.bench_pagination
+"""
+import os
+import random
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault('DB_NAME', 'trivia_bench')
+
+from sqlalchemy import event
+
+from flaskr import create_app
+from models import db, Question, Category
+
+CATEGORIES = ['Science', 'Art', 'Geography', 'History', 'Entertainment',
+              'Sports']
+BATCH_SIZE = 10000
+
+
+class QueryCounter(object):
+    """Counts the SQL statements executed on the engine while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+@contextmanager
+def timed():
+    """Yields a dict whose 'seconds' key is filled in on exit"""
+    result = {}
+    start = time.perf_counter()
+    yield result
+    result['seconds'] = time.perf_counter() - start
+
+
+def reset_schema(categories=CATEGORIES):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(Category.__table__.insert(), [
+        {'id': i, 'type': name} for i, name in enumerate(categories, start=1)])
+    db.session.commit()
+
+
+def grow_questions(start, stop, num_categories=len(CATEGORIES)):
+    """Inserts questions with ids start+1..stop in batches"""
+    for batch_start in range(start, stop, BATCH_SIZE):
+        batch_stop = min(batch_start + BATCH_SIZE, stop)
+        db.session.execute(Question.__table__.insert(), [{
+            'id': i,
+            'question': f'Benchmark question {i}?',
+            'answer': f'Answer {i}',
+            'category': random.randint(1, num_categories),
+            'difficulty': random.randint(1, 5),
+        } for i in range(batch_start + 1, batch_stop + 1)])
+        db.session.commit()
+    if db.engine.dialect.name == 'postgresql':
+        # the ids above were explicit, move the serial past them for inserts
+        db.session.execute("SELECT setval(pg_get_serial_sequence("
+                           "'questions', 'id'), max(id)) FROM questions")
+        db.session.commit()
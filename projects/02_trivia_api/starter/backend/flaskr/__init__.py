@@ -3,26 +3,83 @@ from flask import Flask, request, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import random
+from sqlalchemy import func
 
-from models import setup_db, Question, Category
+from models import setup_db, db, Question
+from .category_cache import CategoryCache
+from .question_count import QuestionCount
+from .question_loader import LOAD_BATCH_SIZE, MAX_BATCH_SIZE, \
+    load_questions, load_questions_command
+from .question_search import create_question_search, search_words
+from .quiz_sessions import QuizSessionStore
 
 QUESTIONS_PER_PAGE = 10
 
 
 def paginate_questions(request, selection):
+    """ Returns the requested page of a question query and its total size
+    only the rows of the page are fetched (LIMIT/OFFSET) and formatted,
+    the total comes from a separate COUNT that is skipped when the page
+    itself shows where the selection ends
+    """
     page = request.args.get('page', 1, type=int)
     start = (page - 1) * QUESTIONS_PER_PAGE
-    end = start + QUESTIONS_PER_PAGE
-    questions = [question.format() for question in selection]
-    current_questions = questions[start:end]
-    return current_questions
+    if start < 0:
+        return [], 0
+    page_questions = selection.limit(QUESTIONS_PER_PAGE).offset(start).all()
+    if 0 < len(page_questions) < QUESTIONS_PER_PAGE or \
+            (start == 0 and not page_questions):
+        total_questions = start + len(page_questions)
+    else:
+        total_questions = selection.order_by(None).with_entities(
+            func.count(Question.id)).scalar()
+    current_questions = [question.format() for question in page_questions]
+    return current_questions, total_questions
+
+
+def question_page(request, selection):
+    """ Returns the formatted questions of the requested page of a query
+    without counting the selection
+    """
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        return []
+    return [question.format() for question in selection.limit(
+        QUESTIONS_PER_PAGE).offset((page - 1) * QUESTIONS_PER_PAGE)]
+
+
+def select_random_question(category_id, previous_questions):
+    """ Picks a random question the player has not seen yet in the database
+    counts the eligible questions, then fetches the one at a random offset,
+    so only a single row is transferred however large the category is;
+    category_id 0 means all categories. returns None when none are left
+    """
+    query = Question.query
+    if category_id != 0:
+        query = query.filter_by(category=category_id)
+    if previous_questions:
+        query = query.filter(~Question.id.in_(previous_questions))
+    eligible = query.with_entities(func.count(Question.id)).scalar()
+    if not eligible:
+        return None
+    return query.order_by(Question.id) \
+        .offset(random.randrange(eligible)).limit(1).first()
 
 
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
+    if test_config is not None:
+        app.config.update(test_config)
     setup_db(app)
 
+    quiz_sessions = QuizSessionStore()
+    category_cache = CategoryCache()
+    question_count = QuestionCount()
+    question_search = create_question_search(app)
+
+    app.cli.add_command(load_questions_command)
+
     # Set up CORS. Allow '*' for origins.
     cors = CORS(app, resources={r"/api/*": {"origins": "*"}})
 
@@ -38,32 +95,49 @@ def create_app(test_config=None):
     def retrieve_categories():
         """ Get for all available categories
         returns 404 if categories are not found
+        served from the in-process category cache with a strong ETag,
+        so conditional requests get a 304 without touching the database
         """
-        categories = list(map(Category.format, Category.query.all()))
-        if len(categories) == 0:
+        categories = category_cache.snapshot()
+        if len(categories.categories) == 0:
             abort(404)
-        return jsonify({
-            'success': True,
-            'categories': categories
-        })
+        response = app.response_class(categories.body,
+                                      mimetype='application/json')
+        response.set_etag(categories.etag)
+        return response.make_conditional(request)
 
     @app.route('/questions')
     def retrieve_questions():
         """ Get for all available questions returns 404
         if questions are not found
+        the strong ETag is the hash of the encoded page, so it changes with
+        whatever writes the questions or categories, from any process
         """
-        selection = Question.query.order_by(Question.id).all()
-        current_questions = paginate_questions(request, selection)
-        categories = list(map(Category.format, Category.query.all()))
+        categories = category_cache.snapshot()
+        selection = Question.query.order_by(Question.id)
+        current_questions, total_questions = paginate_questions(
+            request, selection)
         if len(current_questions) == 0:
             abort(404)
-        return jsonify({
+        response = jsonify({
             'success': True,
             'questions': current_questions,
-            'total_questions': len(selection),
-            'categories': categories,
+            'total_questions': total_questions,
+            'categories': categories.categories,
             'current_category': None
         })
+        response.add_etag()
+        return response.make_conditional(request)
+
+    def write_response(response):
+        """ Completes a write response with the maintained question total
+        and, only when ?page= is given, that page of questions
+        """
+        response['total_questions'] = question_count.total()
+        if 'page' in request.args:
+            response['questions'] = question_page(
+                request, Question.query.order_by(Question.id))
+        return jsonify(response)
 
     @app.route('/questions/<int:question_id>', methods=['DELETE'])
     def delete_question(question_id):
@@ -75,13 +149,9 @@ def create_app(test_config=None):
             if not question:
                 abort(422)
             question.delete()
-            selection = Question.query.order_by(Question.id).all()
-            current_questions = paginate_questions(request, selection)
-            return jsonify({
+            return write_response({
                 'success': True,
-                'deleted': question_id,
-                'questions': current_questions,
-                'total_questions': len(selection)
+                'deleted': question_id
             })
         except Exception:
             abort(422)
@@ -100,82 +170,129 @@ def create_app(test_config=None):
                 difficulty=body.get('difficulty', None)
             )
             question.insert()
-            selection = Question.query.order_by(Question.id).all()
-            current_questions = paginate_questions(request, selection)
-            return jsonify({
+            return write_response({
                 'success': True,
                 'created': question.id,
-                'questions': current_questions,
-                'total_questions': len(selection)
+                'question': question.format()
             })
         except Exception:
             abort(422)
 
+    @app.route('/questions/batch', methods=['POST'])
+    def create_questions_batch():
+        """ Create questions from a JSON Lines body, one question per line
+        rows are validated and inserted in transactions of batch_size rows
+        (query string, default 1000); invalid rows are reported and skipped.
+        returns 422 if the body holds no rows at all
+        """
+        batch_size = min(max(request.args.get(
+            'batch_size', LOAD_BATCH_SIZE, type=int), 1), MAX_BATCH_SIZE)
+        report = load_questions(request.stream, batch_size=batch_size)
+        if not report['inserted'] and not report['invalid']:
+            abort(422)
+        return jsonify(dict(report, success=True,
+                            total_questions=question_count.total()))
+
     @app.route('/questions/search', methods=['POST'])
     def search_question():
-        """ Search a question by searchTerm returns 404
+        """ Search questions and answers by searchTerm returns 404
          if the operation fails to signify missing resource
+        every word of the term must start a word of the question or its
+        answer; results are ranked by relevance and paged by the search
+        backend, so only the requested page is loaded
         """
-        body = request.get_json()
+        body = request.get_json() or {}
         search_term = body.get('searchTerm', '')
         if not search_term:
             abort(422)
+        words = search_words(search_term)
+        page = request.args.get('page', 1, type=int)
+        if not words or page < 1:
+            abort(404)
         try:
-            selection = Question.query.order_by(Question.id).filter(
-                Question.question.ilike(f'%{search_term}%')
-            ).all()
-            if not selection:
-                abort(404)
-            current_questions = paginate_questions(request, selection)
-            return jsonify({
-                'success': True,
-                'questions': current_questions,
-                'total_questions': len(selection),
-                'current_category': None
-            })
+            page_questions, total_questions = question_search.search(
+                words, (page - 1) * QUESTIONS_PER_PAGE, QUESTIONS_PER_PAGE)
         except Exception:
             abort(404)
+        if not page_questions:
+            abort(404)
+        return jsonify({
+            'success': True,
+            'questions': [question.format() for question in page_questions],
+            'total_questions': total_questions,
+            'current_category': None
+        })
 
     @app.route('/categories/<int:category_id>/questions')
     def get_questions_by_category(category_id):
         """ Search a question given category_id returns 422
         if the operation fails
         """
-        category = Category.query.filter_by(id=category_id).one_or_none()
+        category = next((category for category
+                         in category_cache.snapshot().categories
+                         if category['id'] == category_id), None)
         if not category:
             abort(422)
         try:
-            selection = Question.query.filter_by(category=category_id).all()
-            if not selection:
+            selection = Question.query.filter_by(category=category_id) \
+                .order_by(Question.id)
+            current_questions, total_questions = paginate_questions(
+                request, selection)
+            if not total_questions:
                 abort(422)
-            current_questions = paginate_questions(request, selection)
             return jsonify({
                 'success': True,
                 'questions': current_questions,
-                'total_questions': len(selection),
-                'current_category': category.type
+                'total_questions': total_questions,
+                'current_category': category['type']
             })
         except Exception:
             abort(422)
 
+    @app.route('/quizzes/sessions', methods=['POST'])
+    def create_quiz_session():
+        """ Start a server-side quiz over a category (id 0 for all)
+        returns a session token to play with, 400 if the category is missing
+        and 404 if it has no questions
+        """
+        body = request.get_json() or {}
+        quiz_category = body.get('quiz_category', None)
+        if quiz_category is None or 'id' not in quiz_category:
+            abort(400)
+        category_id = quiz_category['id']
+
+        def load_question_ids():
+            query = db.session.query(Question.id)
+            if category_id != 0:
+                query = query.filter(Question.category == category_id)
+            return (question_id for question_id, in query)
+
+        question_ids = quiz_sessions.deck(category_id, load_question_ids)
+        if not question_ids:
+            abort(404)
+        return jsonify({
+            'success': True,
+            'session': quiz_sessions.create(question_ids),
+            'total_questions': len(question_ids)
+        })
+
     @app.route('/quizzes', methods=['POST'])
     def get_question_for_quiz():
-        """ Get a question for a quiz return 400 if fails"""
-        body = request.get_json()
+        """ Get a question for a quiz return 400 if fails
+        with a session token the next question is drawn from the server-side
+        session, otherwise the client supplies previous_questions and
+        quiz_category. returns 404 once no questions are left
+        """
+        body = request.get_json() or {}
+        if 'session' in body:
+            return next_session_question(body['session'])
         previous_questions = body.get('previous_questions', None)
         quiz_category = body.get('quiz_category', None)
         if previous_questions is None or quiz_category is None:
             abort(400)
-        query = Question.query
-        if quiz_category['id'] != 0:
-            query = query.filter(~Question.id.in_(previous_questions)) \
-                .filter_by(category=quiz_category['id'])
-        else:
-            query = query.filter(~Question.id.in_(previous_questions))
-        questions = query.all()
-
-        if questions:
-            next_question = random.choice(questions)
+        next_question = select_random_question(quiz_category['id'],
+                                               previous_questions)
+        if next_question:
             return jsonify({
                 'success': True,
                 'question': Question.format(next_question)
@@ -183,6 +300,23 @@ def create_app(test_config=None):
         else:
             abort(404)
 
+    def next_session_question(token):
+        while True:
+            try:
+                question_id = quiz_sessions.pop(token)
+            except KeyError:
+                abort(404)
+            if question_id is None:
+                abort(404)
+            # questions deleted since the session started are skipped
+            question = Question.query.get(question_id)
+            if question:
+                return jsonify({
+                    'success': True,
+                    'question': question.format(),
+                    'remaining_questions': quiz_sessions.remaining(token)
+                })
+
     '''
   Create error handlers for all expected errors
   including 404 and 422.
@@ -0,0 +1,64 @@
+import hashlib
+import json
+import time
+from collections import namedtuple
+from threading import Lock
+
+from models import Category
+from .commit_hooks import on_commit_of
+
+CATEGORY_CACHE_TTL = 5 * 60
+
+# version of the catalog as seen by this process, snapshots of an older
+# one are reloaded
+_generation = 0
+
+
+def _invalidate_categories(writes):
+    global _generation
+    _generation += 1
+
+
+on_commit_of(Category, _invalidate_categories)
+
+
+CategorySnapshot = namedtuple('CategorySnapshot',
+                              ['generation', 'expires_at', 'categories',
+                               'body', 'etag'])
+
+
+class CategoryCache(object):
+    """ In-process copy of the category catalog
+    a snapshot holds the formatted categories, the encoded /categories body
+    and its strong ETag. it is reloaded after a commit writes a Category in
+    this process, and at least every CATEGORY_CACHE_TTL seconds so that
+    writes made by other workers are picked up too
+    """
+
+    def __init__(self, ttl=CATEGORY_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = Lock()
+        self._snapshot = None
+
+    def _load(self):
+        generation = _generation
+        categories = [category.format()
+                      for category in Category.query.order_by(Category.id)]
+        body = json.dumps({
+            'success': True,
+            'categories': categories
+        }).encode()
+        return CategorySnapshot(generation, time.monotonic() + self.ttl,
+                                categories, body,
+                                hashlib.sha1(body).hexdigest())
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.generation != _generation or \
+                snapshot.expires_at <= time.monotonic():
+            with self._lock:
+                snapshot = self._snapshot = self._load()
+        return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
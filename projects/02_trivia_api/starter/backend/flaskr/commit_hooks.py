@@ -0,0 +1,49 @@
+from collections import namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# the number of instances of a model a committed transaction wrote
+ModelWrites = namedtuple('ModelWrites', ['inserted', 'updated', 'deleted'])
+
+# (model, callback) in registration order
+_hooks = []
+
+
+def on_commit_of(model, callback):
+    """ Calls callback(writes) once a commit that wrote instances of model
+    succeeds, with the ModelWrites of the whole transaction
+    writes are collected at every flush and forgotten on rollback, so
+    caches are only invalidated by data other sessions can actually see
+    """
+    _hooks.append((model, callback))
+    return callback
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_writes(session, flush_context):
+    writes = session.info.setdefault('model_writes', {})
+    for model in {model for model, _ in _hooks}:
+        flushed = ModelWrites(
+            *(sum(isinstance(instance, model) for instance in instances)
+              for instances in (session.new, session.dirty,
+                                session.deleted)))
+        if any(flushed):
+            previous = writes.get(model, ModelWrites(0, 0, 0))
+            writes[model] = ModelWrites(
+                *(a + b for a, b in zip(previous, flushed)))
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_hooks(session):
+    writes = session.info.pop('model_writes', None)
+    if not writes:
+        return
+    for model, callback in _hooks:
+        if model in writes:
+            callback(writes[model])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_writes(session):
+    session.info.pop('model_writes', None)
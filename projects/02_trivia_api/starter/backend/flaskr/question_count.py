@@ -0,0 +1,59 @@
+import time
+from threading import Lock
+
+from sqlalchemy import func
+
+from models import db, Question
+from .commit_hooks import on_commit_of
+
+QUESTION_COUNT_TTL = 60
+
+# net number of questions inserted by the commits of this process
+_committed_delta = 0
+_delta_lock = Lock()
+
+
+def record_question_writes(delta):
+    """ Accounts for questions written outside of the ORM unit of work,
+    e.g. by core executemany inserts, once they are committed
+    """
+    global _committed_delta
+    with _delta_lock:
+        _committed_delta += delta
+
+
+def _apply_question_delta(writes):
+    record_question_writes(writes.inserted - writes.deleted)
+
+
+on_commit_of(Question, _apply_question_delta)
+
+
+class QuestionCount(object):
+    """ Running total of the questions table
+    a COUNT is only run on first use and every QUESTION_COUNT_TTL seconds
+    after that, to pick up writes from other workers; in between, inserts
+    and deletes committed in this process adjust the loaded total
+    """
+
+    def __init__(self, ttl=QUESTION_COUNT_TTL):
+        self.ttl = ttl
+        self._lock = Lock()
+        # (counted total, _committed_delta at the time, expires_at)
+        self._state = None
+
+    def _load(self):
+        delta = _committed_delta
+        total = db.session.query(func.count(Question.id)).scalar()
+        return total, delta, time.monotonic() + self.ttl
+
+    def total(self):
+        state = self._state
+        if state is None or state[2] <= time.monotonic():
+            with self._lock:
+                state = self._state = self._load()
+        total, delta, _ = state
+        return total + _committed_delta - delta
+
+    def invalidate(self):
+        self._state = None
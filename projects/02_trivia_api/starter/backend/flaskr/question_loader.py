@@ -0,0 +1,140 @@
+import json
+import time
+from itertools import islice
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, Question, Category
+from .question_count import record_question_writes
+from .question_search import invalidate_search_index
+from .quiz_sessions import invalidate_quiz_decks
+
+LOAD_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+MAX_REPORTED_ERRORS = 100
+DIFFICULTIES = range(1, 6)
+
+
+def read_json_lines(lines):
+    """ Yields (row number, row or None, error or None) for each non blank
+    line of a JSON Lines stream of str or bytes, lazily
+    """
+    number = 0
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line), None
+        except ValueError as e:
+            yield number, None, f'invalid JSON: {e}'
+
+
+def validate_question(row, category_ids):
+    """ Returns (column values, None) for a valid question or (None, errors)
+    """
+    if not isinstance(row, dict):
+        return None, ['expected a JSON object']
+    errors = []
+    values = {}
+    for field in ('question', 'answer'):
+        value = row.get(field)
+        if not isinstance(value, str) or not value.strip():
+            errors.append(f'{field} is required')
+        values[field] = value
+    try:
+        values['category'] = int(row.get('category'))
+    except (TypeError, ValueError):
+        errors.append('category must be a category id')
+    else:
+        if values['category'] not in category_ids:
+            errors.append(f'unknown category {row["category"]}')
+    try:
+        values['difficulty'] = int(row.get('difficulty'))
+    except (TypeError, ValueError):
+        errors.append('difficulty must be an integer')
+    else:
+        if values['difficulty'] not in DIFFICULTIES:
+            errors.append(f'difficulty must be between {DIFFICULTIES[0]} '
+                          f'and {DIFFICULTIES[-1]}')
+    if errors:
+        return None, errors
+    return values, None
+
+
+def load_questions(lines, batch_size=LOAD_BATCH_SIZE):
+    """ Validates and inserts a JSON Lines stream of questions
+    each batch is inserted with a single executemany in its own
+    transaction; invalid rows, and the rows of a batch the database
+    rejects, are reported and skipped. returns a report dict
+    """
+    category_ids = {category_id for category_id,
+                    in db.session.query(Category.id)}
+    rows = read_json_lines(lines)
+    report = {'inserted': 0, 'invalid': 0, 'errors': []}
+
+    def reject(number, errors):
+        report['invalid'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': number, 'errors': errors})
+
+    start = time.perf_counter()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        values = []
+        numbers = []
+        for number, row, error in batch:
+            row_values, errors = validate_question(row, category_ids) \
+                if error is None else (None, [error])
+            if errors:
+                reject(number, errors)
+                continue
+            values.append(row_values)
+            numbers.append(number)
+        if not values:
+            continue
+        try:
+            db.session.execute(Question.__table__.insert(), values)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for number in numbers:
+                reject(number, [f'batch rejected: {e.__class__.__name__}'])
+            continue
+        report['inserted'] += len(values)
+
+    if report['inserted']:
+        # core inserts bypass the ORM events that track question writes
+        record_question_writes(report['inserted'])
+        invalidate_search_index()
+        invalidate_quiz_decks()
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    report['rows_per_second'] = round(
+        report['inserted'] / report['seconds']) if report['seconds'] else 0
+    return report
+
+
+@click.command('load-questions')
+@click.argument('path', type=click.File('rb'))
+@click.option('--batch-size', default=LOAD_BATCH_SIZE, show_default=True,
+              type=click.IntRange(1, None),
+              help='Questions committed per transaction.')
+@with_appcontext
+def load_questions_command(path, batch_size):
+    """ Load questions from a JSON Lines file ('-' for stdin)"""
+    report = load_questions(path, batch_size=batch_size)
+    for error in report['errors']:
+        click.echo(f'row {error["row"]}: {"; ".join(error["errors"])}',
+                   err=True)
+    if report['invalid'] > len(report['errors']):
+        click.echo(f'... {report["invalid"] - len(report["errors"])} more '
+                   f'invalid rows', err=True)
+    click.echo(f'loaded {report["inserted"]} questions '
+               f'({report["invalid"]} invalid) in {report["seconds"]}s, '
+               f'{report["rows_per_second"]:,} rows/s')
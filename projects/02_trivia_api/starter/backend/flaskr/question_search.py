@@ -0,0 +1,134 @@
+import os
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+from sqlalchemy import func, literal_column
+
+from models import db, Question
+from .commit_hooks import on_commit_of
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+# the document searched on PostgreSQL, question and answer together. the
+# ix_questions_search expression index, created by migration 5d1f0c7a9b32,
+# must use the very same expression to be picked up
+SEARCH_DOCUMENT = func.to_tsvector(
+    literal_column("'english'::regconfig"),
+    func.coalesce(Question.question, '') + ' ' +
+    func.coalesce(Question.answer, ''))
+
+# the in-memory index is rebuilt when this moves on: after committed
+# Question writes and after bulk loads
+_generation = 0
+
+
+def _invalidate_question_index(writes):
+    invalidate_search_index()
+
+
+on_commit_of(Question, _invalidate_question_index)
+
+
+def invalidate_search_index():
+    """ Marks the in-process index stale after writes made outside of the
+    ORM unit of work, e.g. core executemany inserts
+    """
+    global _generation
+    _generation += 1
+
+
+def search_words(term):
+    """ Splits a search term into lower case words"""
+    return [word.lower() for word in WORD_RE.findall(term)]
+
+
+class PostgresQuestionSearch(object):
+    """ Full-text search over the GIN index on question and answer
+    every word of the term must prefix a (stemmed) lexeme of the document,
+    matches are ranked with ts_rank, and the page and the total count come
+    back from a single statement. without the index (run flask db upgrade)
+    results are the same but every search scans the table
+    """
+
+    def search(self, words, offset, limit):
+        query = func.to_tsquery(literal_column("'english'::regconfig"),
+                                ' & '.join(word + ':*' for word in words))
+        rows = db.session.query(Question, func.count().over()) \
+            .filter(SEARCH_DOCUMENT.op('@@')(query)) \
+            .order_by(func.ts_rank(SEARCH_DOCUMENT, query).desc(),
+                      Question.id) \
+            .limit(limit).offset(offset).all()
+        total = rows[0][1] if rows else 0
+        return [question for question, _ in rows], total
+
+
+class InMemoryQuestionSearch(object):
+    """ Inverted index of question and answer words kept in process
+    used where there is no full-text search in the database (SQLite). the
+    index is rebuilt on the first search after a commit wrote a Question;
+    words match by prefix and results are ranked by how often the matched
+    words occur, then by id
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._generation = None
+        self._postings = {}
+        self._words = []
+
+    def _build(self):
+        postings = defaultdict(lambda: defaultdict(int))
+        rows = db.session.query(Question.id, Question.question,
+                                Question.answer)
+        for question_id, question, answer in rows:
+            for word in search_words(f'{question or ""} {answer or ""}'):
+                postings[word][question_id] += 1
+        self._postings = {word: dict(ids) for word, ids in postings.items()}
+        self._words = sorted(self._postings)
+
+    def _matches(self, word):
+        scores = defaultdict(int)
+        start = bisect_left(self._words, word)
+        for indexed in self._words[start:]:
+            if not indexed.startswith(word):
+                break
+            for question_id, count in self._postings[indexed].items():
+                scores[question_id] += count
+        return scores
+
+    def search(self, words, offset, limit):
+        with self._lock:
+            if self._generation != _generation:
+                generation = _generation
+                self._build()
+                self._generation = generation
+            scores = None
+            for word in words:
+                matches = self._matches(word)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {question_id: score + matches[question_id]
+                              for question_id, score in scores.items()
+                              if question_id in matches}
+        ranked = sorted(scores or (), key=lambda id: (-scores[id], id))
+        page_ids = ranked[offset:offset + limit]
+        questions = {question.id: question for question in
+                     Question.query.filter(Question.id.in_(page_ids))} \
+            if page_ids else {}
+        return [questions[id] for id in page_ids if id in questions], \
+            len(ranked)
+
+
+def create_question_search(app):
+    """ Picks the search backend from QUESTION_SEARCH_BACKEND ('postgresql'
+    or 'memory'), in the app config or the environment, or from the
+    database dialect when it is not set
+    """
+    name = app.config.get('QUESTION_SEARCH_BACKEND') or \
+        os.getenv('QUESTION_SEARCH_BACKEND') or db.engine.dialect.name
+    if name == 'postgresql':
+        return PostgresQuestionSearch()
+    return InMemoryQuestionSearch()
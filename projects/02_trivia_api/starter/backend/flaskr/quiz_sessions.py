@@ -0,0 +1,129 @@
+import math
+import random
+import secrets
+import time
+from array import array
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+from models import Question
+from .commit_hooks import on_commit_of
+
+QUIZ_SESSION_TTL = 30 * 60
+MAX_QUIZ_SESSIONS = 10000
+QUIZ_DECK_TTL = 60
+
+# decks are reshuffled for new sessions when this moves on: after committed
+# Question writes and after bulk loads
+_generation = 0
+
+
+def _invalidate_decks(writes):
+    invalidate_quiz_decks()
+
+
+on_commit_of(Question, _invalidate_decks)
+
+
+def invalidate_quiz_decks():
+    """ Marks the shared decks stale after writes made outside of the ORM
+    unit of work, e.g. core executemany inserts
+    """
+    global _generation
+    _generation += 1
+
+
+QuizDeck = namedtuple('QuizDeck', ['generation', 'expires_at', 'ids'])
+
+
+class QuizSessionStore(object):
+    """ In-process store of quiz sessions keyed by an opaque token
+    the question ids of a category are shuffled once into a deck, an int
+    array shared by every session started on that category. a session only
+    holds the deck, a random start and a stride coprime with its length,
+    and the number of questions drawn; walking the deck by that stride
+    visits every question exactly once in a per-session order, so starting
+    a session and drawing a question both cost O(1).
+    decks are reshuffled after a commit writes a Question in this process
+    and at least every QUIZ_DECK_TTL seconds; sessions keep the deck they
+    started with. sessions expire QUIZ_SESSION_TTL seconds after their
+    last draw and the least recently used ones are evicted past
+    MAX_QUIZ_SESSIONS
+    """
+
+    def __init__(self, ttl=QUIZ_SESSION_TTL, max_sessions=MAX_QUIZ_SESSIONS,
+                 deck_ttl=QUIZ_DECK_TTL):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.deck_ttl = deck_ttl
+        self._sessions = OrderedDict()
+        self._decks = {}
+        self._lock = Lock()
+        self._deck_lock = Lock()
+
+    def _evict(self, now):
+        # sessions are kept in last-use order, so expired ones are up front
+        while self._sessions:
+            token, (expires_at, _) = next(iter(self._sessions.items()))
+            if expires_at > now and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[token]
+
+    def deck(self, key, load_ids):
+        """ The shared shuffled question ids of key, loaded with load_ids()
+        when missing or stale; empty decks are not kept
+        """
+        deck = self._decks.get(key)
+        if deck is None or deck.generation != _generation or \
+                deck.expires_at <= time.monotonic():
+            with self._deck_lock:
+                generation = _generation
+                ids = array('l', load_ids())
+                random.shuffle(ids)
+                deck = QuizDeck(generation, time.monotonic() + self.deck_ttl,
+                                ids)
+                if ids:
+                    self._decks[key] = deck
+                else:
+                    self._decks.pop(key, None)
+        return deck.ids
+
+    def create(self, ids):
+        """ Starts a session over a deck and returns its token"""
+        step = 1
+        if len(ids) > 1:
+            step = random.randrange(1, len(ids))
+            while math.gcd(step, len(ids)) != 1:
+                step = random.randrange(1, len(ids))
+        # [deck, start, stride, drawn]
+        state = [ids, random.randrange(len(ids)) if ids else 0, step, 0]
+        token = secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[token] = (now + self.ttl, state)
+            self._evict(now)
+        return token
+
+    def pop(self, token):
+        """ Draws the next question id of a session
+        raises KeyError for unknown or expired tokens and returns None once
+        every question has been drawn
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            _, state = self._sessions.pop(token)
+            self._sessions[token] = (now + self.ttl, state)
+            ids, start, step, drawn = state
+            if drawn == len(ids):
+                return None
+            state[3] = drawn + 1
+            return ids[(start + drawn * step) % len(ids)]
+
+    def remaining(self, token):
+        with self._lock:
+            ids, _, _, drawn = self._sessions[token][1]
+            return len(ids) - drawn
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,37 @@
+"""questions full-text search index
+
+Revision ID: 5d1f0c7a9b32
+Revises: ecec2bb3c214
+Create Date: 2021-01-24 11:02:13.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1f0c7a9b32'
+down_revision = 'ecec2bb3c214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # PostgreSQL only, other databases are searched in process. the
+    # expression must match flaskr.question_search.SEARCH_DOCUMENT, and
+    # CONCURRENTLY keeps the table writable while the index builds, which
+    # needs to run outside of the migration transaction
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_questions_search "
+            "ON questions USING gin (to_tsvector('english'::regconfig, "
+            "coalesce(question, '') || ' ' || coalesce(answer, '')))")
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_questions_search')
@@ -0,0 +1,43 @@
+"""trivia.psql baseline
+
+Revision ID: bb652ea06f01
+Revises: 
+Create Date: 2021-01-24 10:02:41.337182
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bb652ea06f01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # databases restored from trivia.psql, or created by setup_db's
+    # create_all, already have these tables
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'categories' not in tables:
+        op.create_table('categories',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'questions' not in tables:
+        op.create_table('questions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('question', sa.Text(), nullable=True),
+        sa.Column('answer', sa.Text(), nullable=True),
+        sa.Column('difficulty', sa.Integer(), nullable=True),
+        sa.Column('category', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['category'], ['categories.id'], name='category', onupdate='CASCADE', ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('questions')
+    op.drop_table('categories')
@@ -0,0 +1,43 @@
+"""questions.category integer foreign key and (category, id) index
+
+The type and foreign key changes are one-way: they only apply to tables
+created by the old String column model, and trivia.psql already has both,
+so downgrade() cannot tell which to undo and only drops the index.
+
+Revision ID: ecec2bb3c214
+Revises: bb652ea06f01
+Create Date: 2021-01-24 10:31:07.582916
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ecec2bb3c214'
+down_revision = 'bb652ea06f01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name']: column
+               for column in inspector.get_columns('questions')}
+    # tables created from the old model hold the category ids as strings
+    if not isinstance(columns['category']['type'], sa.Integer):
+        op.alter_column('questions', 'category', type_=sa.Integer(),
+                        postgresql_using='category::integer')
+    if not any(fk['constrained_columns'] == ['category']
+               for fk in inspector.get_foreign_keys('questions')):
+        op.execute('UPDATE questions SET category = NULL WHERE category '
+                   'NOT IN (SELECT id FROM categories)')
+        op.create_foreign_key('category', 'questions', 'categories', ['category'], ['id'], onupdate='CASCADE', ondelete='SET NULL')
+    if not any(index['name'] == 'ix_questions_category_id'
+               for index in inspector.get_indexes('questions')):
+        op.create_index('ix_questions_category_id', 'questions', ['category', 'id'], unique=False)
+
+
+def downgrade():
+    # one-way for questions.category, see the module docstring
+    op.drop_index('ix_questions_category_id', table_name='questions')
@@ -1,6 +1,8 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+from sqlalchemy import Column, String, Integer, ForeignKey, Index, \
+    create_engine
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
 import json
 
 DB_HOST = os.getenv('DB_HOST', '127.0.0.1:5432')
@@ -13,6 +15,7 @@ DB_PATH = 'postgresql+psycopg2://{}:{}@{}/{}'.format(DB_USER,
                                                      DB_NAME)
 
 db = SQLAlchemy()
+migrate = Migrate()
 
 
 '''
@@ -26,6 +29,7 @@ def setup_db(app, database_path=DB_PATH):
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     db.app = app
     db.init_app(app)
+    migrate.init_app(app, db)
     db.create_all()
 
 
@@ -37,11 +41,17 @@ Question
 
 class Question(db.Model):
     __tablename__ = 'questions'
+    __table_args__ = (
+        # category listings filter on category and page in id order
+        Index('ix_questions_category_id', 'category', 'id'),
+    )
 
     id = Column(Integer, primary_key=True)
     question = Column(String)
     answer = Column(String)
-    category = Column(String)
+    category = Column(Integer, ForeignKey('categories.id', name='category',
+                                          onupdate='CASCADE',
+                                          ondelete='SET NULL'))
     difficulty = Column(Integer)
 
     def __init__(self, question, answer, category, difficulty):
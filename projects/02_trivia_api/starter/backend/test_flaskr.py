@@ -55,6 +55,18 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(len(data['questions']))
         self.assertTrue(len(data["categories"]))
 
+    def test_get_last_page_of_questions(self):
+        """Test the last page holds the remainder of the total"""
+        first = json.loads(self.client().get('/questions').data)
+        total = first['total_questions']
+        last_page = (total - 1) // 10 + 1
+        res = self.client().get(f'/questions?page={last_page}')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['total_questions'], total)
+        self.assertEqual(len(data['questions']), total - (last_page - 1) * 10)
+
     def test_404_sent_requesting_beyond_valid_page(self):
         """Test pagination for questions larger than page size returns 404"""
         res = self.client().get('/questions?page=1000')
@@ -66,7 +78,7 @@ class TriviaTestCase(unittest.TestCase):
 
     def test_delete_questions(self):
         """Test deletion of questions based on given id"""
-        res = self.client().delete('/questions/9')
+        res = self.client().delete('/questions/9?page=1')
         data = json.loads(res.data)
 
         self.assertEqual(res.status_code, 200)
@@ -92,6 +104,67 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertTrue(data['categories'])
 
+    def test_304_for_unchanged_categories(self):
+        """Test conditional GET of categories with the returned ETag"""
+        res = self.client().get('/categories')
+        etag = res.headers.get('ETag')
+        self.assertTrue(etag)
+
+        res = self.client().get('/categories',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b'')
+
+    def test_304_for_unchanged_questions_page(self):
+        """Test conditional GET of a questions page with its ETag"""
+        res = self.client().get('/questions?page=1')
+        etag = res.headers.get('ETag')
+        self.assertTrue(etag)
+
+        res = self.client().get('/questions?page=1',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 304)
+
+        res = self.client().get('/questions?page=2',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
+
+    def test_questions_page_etag_changes_after_write(self):
+        """Test a question write invalidates the ETag of a questions page"""
+        res = self.client().get('/questions?page=1')
+        etag = res.headers.get('ETag')
+
+        res = self.client().post('/questions', json={
+            'question': 'What is the capital of Norway?',
+            'answer': 'Oslo',
+            'difficulty': 1,
+            'category': 3
+        })
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client().get('/questions?page=1',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res.headers.get('ETag'), etag)
+
+    def test_questions_page_etag_changes_after_outside_write(self):
+        """Test a write made outside the app invalidates the page ETag"""
+        res = self.client().get('/questions?page=1')
+        etag = res.headers.get('ETag')
+
+        with self.app.app_context():
+            first = self.db.session.execute(
+                'SELECT min(id) FROM questions').scalar()
+            self.db.session.execute(
+                "UPDATE questions SET answer = answer || ' ' WHERE id = :id",
+                {'id': first})
+            self.db.session.commit()
+
+        res = self.client().get('/questions?page=1',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res.headers.get('ETag'), etag)
+
     def test_create_new_question(self):
         """Test creating questions"""
         mock_question = {
@@ -106,6 +179,24 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertEqual(data['success'], True)
 
+    def test_create_question_returns_it_with_maintained_total(self):
+        """Test creating a question echoes it and the new total only"""
+        total = json.loads(self.client().get('/questions').data)[
+            'total_questions']
+        res = self.client().post('/questions', json={
+            'question': 'Which planet is known as the red planet?',
+            'answer': 'Mars',
+            'difficulty': 1,
+            'category': 1
+        })
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['question']['id'], data['created'])
+        self.assertEqual(data['question']['answer'], 'Mars')
+        self.assertEqual(data['total_questions'], total + 1)
+        self.assertNotIn('questions', data)
+
     def test_422_valid_new_question(self):
         """Test creating questions"""
 
@@ -116,6 +207,37 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data["success"], False)
         self.assertEqual(data['message'], 'unprocessable')
 
+    def test_create_questions_batch(self):
+        """Test loading JSON Lines of questions reports invalid rows"""
+        lines = [
+            {'question': 'Batch question?', 'answer': 'Batch',
+             'difficulty': 3, 'category': 2},
+            {'question': 'Unknown category?', 'answer': 'None',
+             'difficulty': 3, 'category': 1000},
+            {'question': 'Too hard?', 'answer': 'Yes',
+             'difficulty': 9, 'category': 2},
+        ]
+        body = '\n'.join(json.dumps(line) for line in lines) + '\nnot json\n'
+        res = self.client().post('/questions/batch?batch_size=2', data=body,
+                                 content_type='application/x-ndjson')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['inserted'], 1)
+        self.assertEqual(data['invalid'], 3)
+        self.assertEqual([error['row'] for error in data['errors']],
+                         [2, 3, 4])
+
+    def test_422_empty_questions_batch(self):
+        """Test loading an empty batch of questions"""
+        res = self.client().post('/questions/batch', data='',
+                                 content_type='application/x-ndjson')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+
     def test_get_questions_search_with_results(self):
         """Test Search questions"""
 
@@ -128,6 +250,17 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data['total_questions'])
         self.assertTrue(len(data['questions']))
 
+    def test_get_questions_search_matches_answers(self):
+        """Test Search questions looks into answers by word prefix"""
+
+        res = self.client().post('/questions/search',
+                                 json={'searchTerm': 'apol'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('Apollo 13',
+                      [question['answer'] for question in data['questions']])
+
     def test_get_questions_search_without_results(self):
         """Test empty Search questions"""
 
@@ -181,6 +314,71 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data["success"], True)
         self.assertTrue(data["question"])
 
+    def test_get_question_for_quiz_skips_previous_questions(self):
+        """Test the quiz only returns questions not played yet"""
+        res = self.client().get('/categories/3/questions')
+        ids = [q['id'] for q in json.loads(res.data)['questions']]
+        mock_data = {
+            'previous_questions': ids[:-1],
+            'quiz_category': {
+                'type': 'Geography',
+                'id': 3
+            }
+        }
+        res = self.client().post('/quizzes', json=mock_data)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['question']['id'], ids[-1])
+
+    def test_play_quiz_with_session(self):
+        """Test a server-side quiz session draws every question once"""
+        res = self.client().post('/quizzes/sessions', json={
+            'quiz_category': {'type': 'Geography', 'id': 3}})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertTrue(data['session'])
+
+        seen = set()
+        for _ in range(data['total_questions']):
+            res = self.client().post('/quizzes',
+                                     json={'session': data['session']})
+            question = json.loads(res.data)['question']
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(question['category'], 3)
+            seen.add(question['id'])
+        self.assertEqual(len(seen), data['total_questions'])
+
+        res = self.client().post('/quizzes', json={'session': data['session']})
+        self.assertEqual(res.status_code, 404)
+
+    def test_quiz_session_sees_new_questions(self):
+        """Test a session started after a write includes the new question"""
+        category = {'quiz_category': {'type': 'Geography', 'id': 3}}
+        res = self.client().post('/quizzes/sessions', json=category)
+        total = json.loads(res.data)['total_questions']
+
+        res = self.client().post('/questions', json={
+            'question': 'What is the capital of Finland?',
+            'answer': 'Helsinki',
+            'difficulty': 1,
+            'category': 3
+        })
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client().post('/quizzes/sessions', json=category)
+        self.assertEqual(json.loads(res.data)['total_questions'], total + 1)
+
+    def test_404_quiz_with_unknown_session(self):
+        """Test playing with an unknown session token"""
+        res = self.client().post('/quizzes', json={'session': 'unknown'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(data['success'], False)
+
     def test_400_get_question_for_quiz(self):
         """Test get question by quiz that is not valid"""
         mock_data = {
@@ -209,6 +407,54 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data["success"], False)
 
 
+class InMemorySearchTestCase(unittest.TestCase):
+    """Search through the in-process index used where the database has no
+    full-text search. Unlike PostgreSQL it does no stemming and keeps stop
+    words, so it is exercised on its own here"""
+
+    def setUp(self):
+        self.app = create_app({'QUESTION_SEARCH_BACKEND': 'memory'})
+        self.client = self.app.test_client
+        setup_db(self.app, DB_PATH)
+
+    def search(self, term):
+        res = self.client().post('/questions/search',
+                                 json={'searchTerm': term})
+        return res.status_code, json.loads(res.data)
+
+    def test_search_matches_every_word_by_prefix(self):
+        """Test all words must prefix a word of the question or answer"""
+        status, data = self.search('APOL hank')
+
+        self.assertEqual(status, 200)
+        self.assertIn('Apollo 13',
+                      [question['answer'] for question in data['questions']])
+
+        status, data = self.search('apol cruise')
+        self.assertEqual(status, 404)
+
+    def test_search_ranks_by_matches_and_sees_new_questions(self):
+        """Test ranking by word occurrences and rebuild after a write"""
+        status, data = self.search('zyzzyva')
+        total = data['total_questions'] if status == 200 else 0
+
+        for question, answer in (('Is a zyzzyva a weevil?', 'Yes'),
+                                 ('Which weevil is the zyzzyva?',
+                                  'Zyzzyva zyzzyva')):
+            res = self.client().post('/questions', json={
+                'question': question,
+                'answer': answer,
+                'difficulty': 1,
+                'category': 1
+            })
+            self.assertEqual(res.status_code, 200)
+
+        status, data = self.search('zyzz')
+        self.assertEqual(status, 200)
+        self.assertEqual(data['total_questions'], total + 2)
+        self.assertEqual(data['questions'][0]['answer'], 'Zyzzyva zyzzyva')
+
+
 # Make the tests conveniently executable
 if __name__ == "__main__":
     unittest.main()
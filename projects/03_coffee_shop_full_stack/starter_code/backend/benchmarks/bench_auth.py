@@ -0,0 +1,181 @@
+"""Load test of the auth pipeline against a local JWKS stub.
+
+Serves a JWKS from a local HTTP stub that answers after JWKS_LATENCY, and
+runs CONCURRENCY async views over REQUESTS requests. A FRESH_RATIO share of
+them carries a new token, the others reuse a token seen before. The signing
+key rotates every ROTATE_EVERY requests and each JWKS fetch publishes one
+more key, so the key cache keeps meeting unknown kids and refetching.
+
+Compares the blocking verify_token called from a coroutine (what a sync
+decorator does inside an async view), verify_token_async, and
+verify_token_async with a verification thread pool. Reports throughput,
+the longest event loop stall, and the JWKS fetches and connections the
+stub saw:
+
+    python -m benchmarks.bench_auth
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from jose import jwt
+
+REQUESTS = 2000
+FRESH_RATIO = 0.2
+CONCURRENCY = 50
+ROTATE_EVERY = 200
+JWKS_LATENCY = 0.05
+VIEW_IO = 0.005
+VERIFY_WORKERS = 4
+
+
+def generate_key():
+    """(private PEM, n, e) of a new RSA key, with jose's RSA backend"""
+    try:
+        from Crypto.PublicKey import RSA
+    except ImportError:
+        import rsa
+        public, private = rsa.newkeys(2048)
+        return private.save_pkcs1().decode(), public.n, public.e
+    key = RSA.generate(2048)
+    return key.exportKey().decode(), key.n, key.e
+
+
+def b64_int(n):
+    data = n.to_bytes((n.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+PEM, N, E = generate_key()
+KIDS = [f'key-{i}' for i in range(REQUESTS // ROTATE_EVERY + 1)]
+
+
+def jwks(published):
+    return json.dumps({'keys': [{
+        'kty': 'RSA', 'kid': kid, 'use': 'sig', 'alg': 'RS256',
+        'n': b64_int(N), 'e': b64_int(E),
+    } for kid in KIDS[:published]]}).encode()
+
+
+class JWKSStub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests = 0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        JWKSStub.connections += 1
+
+    def do_GET(self):
+        JWKSStub.requests += 1
+        body = jwks(JWKSStub.requests)
+        time.sleep(JWKS_LATENCY)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+stub = ThreadingHTTPServer(('127.0.0.1', 0), JWKSStub)
+stub.daemon_threads = True
+threading.Thread(target=stub.serve_forever, daemon=True).start()
+os.environ['JWKS_URL'] = \
+    f'http://127.0.0.1:{stub.server_port}/.well-known/jwks.json'
+
+from src.auth import auth  # noqa: E402
+from src.auth.jwks import JWKSCache  # noqa: E402
+
+
+def mint(i):
+    return jwt.encode({
+        'iss': f'https://{auth.AUTH0_DOMAIN}/',
+        'aud': auth.API_AUDIENCE,
+        'sub': f'user-{i}',
+        'exp': int(time.time()) + 3600,
+        'permissions': ['get:drinks-detail'],
+    }, PEM, algorithm='RS256', headers={'kid': KIDS[i // ROTATE_EVERY]})
+
+
+def requests():
+    """The token of each request, every rotation opens with a fresh one"""
+    random.seed(0)
+    tokens = []
+    fresh = []
+    for i in range(REQUESTS):
+        if i % ROTATE_EVERY == 0 or random.random() < FRESH_RATIO:
+            fresh.append(mint(i))
+            tokens.append(fresh[-1])
+        else:
+            tokens.append(random.choice(fresh))
+    return tokens, len(fresh)
+
+
+async def blocking_verify(token):
+    return auth.verify_token(token)
+
+
+async def watch_loop(stalls, done):
+    """Records the longest time the event loop did not get back to us"""
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        stalls.append(time.perf_counter() - start - 0.001)
+
+
+async def load(verify, tokens):
+    pending = iter(tokens)
+
+    async def view():
+        for token in pending:
+            await verify(token)
+            await asyncio.sleep(VIEW_IO)
+
+    stalls = []
+    done = asyncio.Event()
+    watcher = asyncio.ensure_future(watch_loop(stalls, done))
+    start = time.perf_counter()
+    await asyncio.gather(*(view() for _ in range(CONCURRENCY)))
+    seconds = time.perf_counter() - start
+    done.set()
+    await watcher
+    return seconds, max(stalls)
+
+
+def run(name, verify, tokens, executor=None):
+    auth.jwks_cache = JWKSCache(auth.JWKS_URL, min_refetch_interval=0)
+    auth.token_cache.clear()
+    auth.verify_executor = executor
+    JWKSStub.requests = JWKSStub.connections = 0
+    seconds, stall = asyncio.run(load(verify, tokens))
+    print(f'{name:<26} {len(tokens) / seconds:>8.0f} {stall * 1000:>10.1f} '
+          f'{JWKSStub.requests:>7} {JWKSStub.connections:>6}')
+    if executor is not None:
+        executor.shutdown()
+
+
+def main():
+    tokens, fresh = requests()
+    print(f'{REQUESTS} requests ({fresh} fresh tokens), {CONCURRENCY} '
+          f'concurrent views, key rotated every {ROTATE_EVERY} requests, '
+          f'JWKS latency {JWKS_LATENCY * 1000:.0f} ms, view I/O '
+          f'{VIEW_IO * 1000:.0f} ms, {os.cpu_count()} CPUs')
+    print(f'{"verification":<26} {"req/s":>8} {"stall ms":>10} '
+          f'{"fetches":>7} {"conns":>6}')
+    run('blocking verify_token', blocking_verify, tokens)
+    run('verify_token_async', auth.verify_token_async, tokens)
+    run(f'verify_token_async, {VERIFY_WORKERS} thr', auth.verify_token_async,
+        tokens, ThreadPoolExecutor(VERIFY_WORKERS))
+
+
+if __name__ == '__main__':
+    main()
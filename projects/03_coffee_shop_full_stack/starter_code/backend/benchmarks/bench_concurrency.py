@@ -0,0 +1,123 @@
+"""Concurrency benchmark of the SQLite database profiles.
+
+Runs a mixed read/write drink workload from several worker processes, each
+with several threads, the way gunicorn workers share the database file, and
+reports throughput, write latency and "database is locked" failures for
+each profile in DATABASE_PROFILES:
+
+    python -m benchmarks.bench_concurrency
+"""
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+BENCH_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'bench.db')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DB}')
+
+from flask import Flask  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from src.database.models import DATABASE_PROFILES, Drink, db, \
+    setup_db  # noqa: E402
+
+NUM_DRINKS = 1000
+PROCESSES = 4
+THREADS = 4
+DURATION = 5
+WRITE_RATIO = 0.2
+
+
+def create_app(profile):
+    app = Flask(__name__)
+    setup_db(app, profile)
+    return app
+
+
+def reset(profile):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(BENCH_DB + suffix):
+            os.remove(BENCH_DB + suffix)
+    app = create_app(profile)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Drink.__table__.insert(), [{
+            'title': f'Drink {i}',
+            'recipe': json.dumps([{'name': 'Water', 'color': 'blue',
+                                   'parts': 1}]),
+        } for i in range(1, NUM_DRINKS + 1)])
+        db.session.commit()
+        db.engine.dispose()
+
+
+def run_thread(app, deadline, stats):
+    with app.app_context():
+        while time.monotonic() < deadline:
+            drink_id = random.randint(1, NUM_DRINKS)
+            write = random.random() < WRITE_RATIO
+            start = time.perf_counter()
+            try:
+                drink = Drink.query.get(drink_id)
+                if write:
+                    drink.title = f'Drink {drink_id} {random.random()}'
+                    drink.update()
+                else:
+                    drink.long()
+                    db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                stats['locked'] += 1
+                continue
+            finally:
+                db.session.remove()
+            if write:
+                stats['writes'] += 1
+                stats['write_seconds'] += time.perf_counter() - start
+            else:
+                stats['reads'] += 1
+
+
+def run_process(profile, deadline, results):
+    app = create_app(profile)
+    stats = [{'reads': 0, 'writes': 0, 'write_seconds': 0.0, 'locked': 0}
+             for _ in range(THREADS)]
+    threads = [threading.Thread(target=run_thread,
+                                args=(app, deadline, thread_stats))
+               for thread_stats in stats]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put({key: sum(s[key] for s in stats) for key in stats[0]})
+
+
+def main():
+    print(f'{PROCESSES} processes x {THREADS} threads, {DURATION}s, '
+          f'{int(WRITE_RATIO * 100)}% writes over {NUM_DRINKS} drinks')
+    print(f'{"profile":<12} {"reads/s":>9} {"writes/s":>9} '
+          f'{"write ms":>9} {"locked":>7}')
+    for profile in DATABASE_PROFILES:
+        reset(profile)
+        results = multiprocessing.Queue()
+        deadline = time.monotonic() + DURATION
+        processes = [multiprocessing.Process(
+            target=run_process, args=(profile, deadline, results))
+            for _ in range(PROCESSES)]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        total = {key: sum(t[key] for t in totals) for key in totals[0]}
+        write_ms = total['write_seconds'] * 1000 / total['writes'] \
+            if total['writes'] else 0
+        print(f'{profile:<12} {total["reads"] / DURATION:>9.0f} '
+              f'{total["writes"] / DURATION:>9.0f} {write_ms:>9.2f} '
+              f'{total["locked"]:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark of GET /drinks over a large menu.
+
+Seeds its own SQLite database (DATABASE_URL defaults to a file next to this
+script, the app database is left alone) with 100k drinks and times the
+public menu, counting the recipe JSON parses, next to the old short() and
+long() that parsed the recipe on every call (and short() once per key):
+
+    python -m benchmarks.bench_drinks
+"""
+import json
+import os
+import random
+import time
+
+BENCH_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'bench.db')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DB}')
+
+from src.api import app  # noqa: E402
+from src.database.models import (  # noqa: E402
+    db, db_drop_and_create_all, Drink)
+
+NUM_DRINKS = 100000
+BATCH_SIZE = 10000
+SNAPSHOT_REQUESTS = 100
+COLORS = ['white', 'brown', 'grey', 'blue', 'black', 'yellow']
+
+
+class ParseCounter(object):
+    """Counts json.loads calls while active"""
+
+    def __init__(self):
+        self.count = 0
+        self._loads = json.loads
+
+    def _counting_loads(self, *args, **kwargs):
+        self.count += 1
+        return self._loads(*args, **kwargs)
+
+    def __enter__(self):
+        json.loads = self._counting_loads
+        return self
+
+    def __exit__(self, *exc_info):
+        json.loads = self._loads
+
+
+def legacy_short(drink):
+    short_recipe = {}
+    for r in json.loads(drink.recipe):
+        if r == 'color' or r == 'parts':
+            short_recipe[r] = json.loads(drink.recipe)[r]
+    return {'id': drink.id, 'title': drink.title, 'recipe': short_recipe}
+
+
+def legacy_long(drink):
+    return {'id': drink.id, 'title': drink.title,
+            'recipe': json.loads(drink.recipe)}
+
+
+def ingredient(j):
+    return {'name': f'Ingredient {j}', 'color': random.choice(COLORS),
+            'parts': random.randint(1, 3)}
+
+
+def seed(num_drinks):
+    """Half the drinks have a list of ingredients, half a single one"""
+    db_drop_and_create_all()
+    for start in range(0, num_drinks, BATCH_SIZE):
+        db.session.execute(Drink.__table__.insert(), [{
+            'title': f'Drink {i}',
+            'recipe': json.dumps(
+                [ingredient(j) for j in range(random.randint(1, 3))]
+                if i % 2 else ingredient(0)),
+        } for i in range(start, min(start + BATCH_SIZE, num_drinks))])
+        db.session.commit()
+
+
+def main():
+    client = app.test_client()
+    with app.app_context():
+        seed(NUM_DRINKS)
+        drinks = Drink.query.all()
+        with ParseCounter() as legacy_parses:
+            start = time.perf_counter()
+            for drink in drinks:
+                legacy_short(drink)
+                legacy_long(drink)
+            legacy_ms = (time.perf_counter() - start) * 1000
+        with ParseCounter() as parses:
+            start = time.perf_counter()
+            for drink in drinks:
+                drink.short()
+                drink.long()
+            cached_ms = (time.perf_counter() - start) * 1000
+
+    with ParseCounter() as request_parses:
+        start = time.perf_counter()
+        response = client.get('/drinks')
+        request_ms = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200
+    with ParseCounter() as snapshot_parses:
+        start = time.perf_counter()
+        for _ in range(SNAPSHOT_REQUESTS):
+            response = client.get('/drinks',
+                                  headers={'Accept-Encoding': 'gzip'})
+        snapshot_ms = (time.perf_counter() - start) * 1000 / SNAPSHOT_REQUESTS
+    assert response.status_code == 200
+
+    print(f'{NUM_DRINKS} drinks')
+    print(f'{"":<28} {"parses/row":>10} {"ms":>9}')
+    print(f'{"legacy short() + long()":<28} '
+          f'{legacy_parses.count / NUM_DRINKS:>10.2f} {legacy_ms:>9.1f}')
+    print(f'{"short() + long(), same rows":<28} '
+          f'{parses.count / NUM_DRINKS:>10.2f} {cached_ms:>9.1f}')
+    print(f'{"GET /drinks (builds menu)":<28} '
+          f'{request_parses.count / NUM_DRINKS:>10.2f} {request_ms:>9.1f}')
+    print(f'{"GET /drinks (snapshot)":<28} '
+          f'{snapshot_parses.count / NUM_DRINKS:>10.2f} {snapshot_ms:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
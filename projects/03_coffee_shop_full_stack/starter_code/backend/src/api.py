@@ -5,19 +5,55 @@ import json
 from flask_cors import CORS
 import sys
 
-from .database.models import db_drop_and_create_all, setup_db, Drink
-from .auth.auth import AuthError, requires_auth
+import click
+
+from .database.models import db_drop_and_create_all, setup_db, Drink, \
+    MenuChange, menu_version, db, check_schema, migrate_db, SCHEMA_VERSION
+from .auth.auth import AuthError, requires_auth, token_cache
+from .menu import MenuSnapshots, serve_variant
 
 app = Flask(__name__)
 setup_db(app)
 CORS(app)
 
 '''
-@TODO uncomment the following line to initialize the datbase
-!! NOTE THIS WILL DROP ALL RECORDS AND START YOUR DB FROM SCRATCH
-!! NOTE THIS MUST BE UNCOMMENTED ON FIRST RUN
+the schema is no longer rebuilt on import, create or upgrade it once with
+    flask init-db        (--drop wipes an existing database first)
+    flask migrate-db
+workers then only check the schema version before their first request
 '''
-db_drop_and_create_all()
+
+
+@app.before_first_request
+def verify_schema():
+    check_schema()
+
+
+@app.cli.command('init-db')
+@click.option('--drop', is_flag=True,
+              help='Drop every table and record first.')
+def init_db_command(drop):
+    '''Create the database schema, or wipe and recreate it with --drop.'''
+    if drop:
+        db_drop_and_create_all()
+        click.echo(f'recreated the database at schema version '
+                   f'{SCHEMA_VERSION}')
+    else:
+        migrate_db()
+        click.echo(f'database ready at schema version {SCHEMA_VERSION}')
+
+
+@app.cli.command('migrate-db')
+def migrate_db_command():
+    '''Upgrade the database schema, keeping the data.'''
+    start = migrate_db()
+    if start == SCHEMA_VERSION:
+        click.echo(f'database already at schema version {SCHEMA_VERSION}')
+        return
+    click.echo(f'migrated the database from schema version {start} to '
+               f'{SCHEMA_VERSION}')
+
+menu_snapshots = MenuSnapshots()
 
 
 # ROUTES
@@ -27,15 +63,42 @@ def get_drinks():
     GET /drinks
         it should be a public endpoint
         it should contain only the drink.short() data representation
-    returns status code 200 and json {"success": True, "drinks": drinks} where
-    drinks is the list of drinks
+    returns status code 200 and json {"success": True, "drinks": drinks,
+     "version": version} where drinks is the list of drinks and version the
+     menu version they reflect
+    the full menu is served from the pre-encoded snapshot, gzipped if
+    accepted and with an ETag for conditional requests
+    with ?since=<version> only the drinks written after that version are
+    returned, plus the ids of the drinks deleted since in "deleted"
     or appropriate status code indicating reason for failure
     """
+    if 'since' not in request.args:
+        try:
+            return serve_variant(app, request, menu_snapshots.current().short)
+        except Exception:
+            print(sys.exc_info())
+            abort(500)
+
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        abort(400)
     try:
-        drinks = list(map(Drink.short, Drink.query.all()))
+        # read first, a write racing with the listing is sent again next time
+        version = menu_version()
+
+        changed_ids = [drink_id for drink_id, in db.session.query(
+            MenuChange.drink_id).filter(MenuChange.version > since,
+                                        MenuChange.version <= version)
+            .distinct()]
+        drinks = Drink.query.filter(Drink.id.in_(changed_ids)).all() \
+            if changed_ids else []
+        remaining_ids = {drink.id for drink in drinks}
         return jsonify({
             'success': True,
-            'drinks': drinks,
+            'drinks': list(map(Drink.short, drinks)),
+            'deleted': [drink_id for drink_id in changed_ids
+                        if drink_id not in remaining_ids],
+            'version': version,
         }), 200
 
     except Exception:
@@ -50,17 +113,13 @@ def get_drinks_detail(token):
     GET /drinks-detail
     it should require the 'get:drinks-detail' permission
     it should contain the drink.long() data representation
-    returns status code 200 and json {"success": True, "drinks": drinks}
-     where drinks is the list of drinks
+    returns status code 200 and json {"success": True, "drinks": drinks,
+     "version": version} where drinks is the list of drinks
+     served from the pre-encoded snapshot, like GET /drinks
     or appropriate status code indicating reason for failure
     """
     try:
-        drinks = list(map(Drink.long, Drink.query.all()))
-        return jsonify({
-            'success': True,
-            'drinks': drinks,
-        }), 200
-
+        return serve_variant(app, request, menu_snapshots.current().long)
     except Exception:
         abort(500)
 
@@ -73,9 +132,10 @@ def create_drink(jwt):
         it should create a new row in the drinks table
         it should require the 'post:drinks' permission
         it should contain the drink.long() data representation
-    returns status code 200 and json {"success": True, "drinks": drink} where
-    drink an array containing only the newly created
-     drink or appropriate status code indicating reason for failure
+    returns status code 200 and json {"success": True, "drinks": drink,
+     "version": version} where drink an array containing only the newly
+     created drink and version the menu version of the write
+     or appropriate status code indicating reason for failure
     """
     try:
         data = request.get_json()
@@ -86,10 +146,10 @@ def create_drink(jwt):
         drink = Drink(title=data.get('title', None),
                       recipe=recipe)
         drink.insert()
-        drinks = list(map(Drink.long, Drink.query.all()))
         return jsonify({
             'success': True,
-            'drinks': drinks,
+            'drinks': [drink.long()],
+            'version': drink.menu_version,
         }), 200
     except Exception:
         abort(422)
@@ -98,7 +158,10 @@ def create_drink(jwt):
 @app.route('/drinks/<int:drink_id>', methods=['PATCH'])
 @requires_auth('patch:drinks')
 def patch_drink(jwt, drink_id):
-    """updates a drink in database"""
+    """updates a drink in database
+    returns the updated drink alone in "drinks" and the menu version of the
+    write, as create_drink does
+    """
 
     data = request.get_json()
     drink = Drink.query.filter_by(id=drink_id).one_or_none()
@@ -111,10 +174,12 @@ def patch_drink(jwt, drink_id):
     try:
         drink.title = data.get('title', None)
         drink.update()
-        drinks = list(map(Drink.long, Drink.query.all()))
+        # an unchanged title writes nothing and keeps the current version
+        version = getattr(drink, 'menu_version', None) or menu_version()
         return jsonify({
             'success': True,
-            'drinks': drinks,
+            'drinks': [drink.long()],
+            'version': version,
         })
     except Exception:
         abort(422)
@@ -129,8 +194,9 @@ def delete_drink(jwt, drink_id):
         it should respond with a 404 error if <id> is not found
         it should delete the corresponding row for <id>
         it should require the 'delete:drinks' permission
-    returns status code 200 and json {"success": True, "delete": id}
-     where id is the id of the deleted record
+    returns status code 200 and json {"success": True, "delete": id,
+     "version": version} where id is the id of the deleted record and
+     version the menu version of the deletion
         or appropriate status code indicating reason for failure
     """
     drink = Drink.query.filter_by(id=drink_id).one_or_none()
@@ -141,10 +207,22 @@ def delete_drink(jwt, drink_id):
         return jsonify({
             'success': True,
             'delete': drink_id,
+            'version': drink.menu_version,
         })
     except Exception:
         abort(422)
 
+@app.route('/auth/stats')
+def get_auth_stats():
+    """
+    GET /auth/stats
+        hit rate and size of the verified-token cache
+    """
+    return jsonify({
+        'success': True,
+        'token_cache': token_cache.stats(),
+    })
+
 # Error Handling
 
 
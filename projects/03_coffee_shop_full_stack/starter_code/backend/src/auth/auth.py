@@ -1,13 +1,30 @@
-import json
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from flask import request, _request_ctx_stack
 from functools import wraps
 from jose import jwt
-from urllib.request import urlopen
+
+from .jwks import JWKSCache
+from .token_cache import TokenCache
 
 
 AUTH0_DOMAIN = 'fsnd-nes.us.auth0.com'
 ALGORITHMS = ['RS256']
 API_AUDIENCE = 'coffe-shop-api'
+# set JWKS_URL to point at a local JWKS file or stub, e.g. in tests
+JWKS_URL = os.environ.get(
+    'JWKS_URL', f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
+
+# async views verify token signatures on this many threads, off the event
+# loop; 0 verifies them on the loop
+AUTH_VERIFY_WORKERS = int(os.environ.get('AUTH_VERIFY_WORKERS', 0))
+
+jwks_cache = JWKSCache(JWKS_URL)
+token_cache = TokenCache()
+verify_executor = ThreadPoolExecutor(
+    AUTH_VERIFY_WORKERS, thread_name_prefix='jwt-verify') \
+    if AUTH_VERIFY_WORKERS > 0 else None
 
 
 # AuthError Exception
@@ -55,17 +72,22 @@ def get_token_auth_header():
     return token
 
 
-def check_permissions(permission, payload):
-    """check permission in payload"""
-    # Ensures that there is permissions field in the payload
-    if 'permissions' not in payload:
-        raise AuthError({
-            'code': 'invalid_claims',
-            'description': 'Permissions not included in JWT.'
-        }, 401)
+def check_permissions(permission, payload, permissions=None):
+    """check permission in payload
+    permissions is the precomputed frozenset of the payload's permissions
+    claim, as kept by the token cache
+    """
+    if permissions is None:
+        # Ensures that there is permissions field in the payload
+        if 'permissions' not in payload:
+            raise AuthError({
+                'code': 'invalid_claims',
+                'description': 'Permissions not included in JWT.'
+            }, 401)
+        permissions = frozenset(payload['permissions'])
 
     # Ensures that the specific permission exists
-    if permission not in payload['permissions']:
+    if permission not in permissions:
         raise AuthError({
             'code': 'unauthorized',
             'description': 'Permission not found.'
@@ -75,28 +97,46 @@ def check_permissions(permission, payload):
     return True
 
 
-def verify_decode_jwt(token):
-    '''Verifies and decodes the jwt from the given token'''
-
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
+def get_unverified_kid(token):
+    '''Returns the kid of the key the token claims to be signed with'''
     unverified_header = jwt.get_unverified_header(token)
-    rsa_key = {}
     if 'kid' not in unverified_header:
         raise AuthError({
             'code': 'invalid_header',
             'description': 'Authorization malformed.'
         }, 401)
+    return unverified_header['kid']
+
+
+def jwks_unavailable():
+    return AuthError({
+        'code': 'jwks_unavailable',
+        'description': 'Unable to fetch the signing keys.'
+    }, 503)
+
+
+def get_signing_key(token):
+    '''Returns the issuer's key for the token, or None'''
+    # keys come from memory; the JWKS is only refetched for an unknown kid
+    # or in the background once the cached set is older than its TTL
+    kid = get_unverified_kid(token)
+    try:
+        return jwks_cache.get_key(kid)
+    except Exception:
+        raise jwks_unavailable()
 
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
+
+async def get_signing_key_async(token):
+    '''get_signing_key for async views, refetches run off the event loop'''
+    kid = get_unverified_kid(token)
+    try:
+        return await jwks_cache.get_key_async(kid)
+    except Exception:
+        raise jwks_unavailable()
+
+
+def decode_jwt(token, rsa_key):
+    '''Verifies the token's signature and claims with rsa_key'''
     if rsa_key:
         try:
             payload = jwt.decode(
@@ -132,6 +172,11 @@ def verify_decode_jwt(token):
             }, 400)
 
 
+def verify_decode_jwt(token):
+    '''Verifies and decodes the jwt from the given token'''
+    return decode_jwt(token, get_signing_key(token))
+
+
 '''
 @TODO implement @requires_auth(permission) decorator method
     @INPUTS
@@ -144,15 +189,60 @@ def verify_decode_jwt(token):
 '''
 
 
+def verify_token(token):
+    '''
+    Returns the VerifiedToken of a token
+    a token seen before is served from the token cache until it expires,
+    otherwise it is verified with verify_decode_jwt and cached
+    '''
+    verified = token_cache.get(token)
+    if verified is None:
+        verified = token_cache.put(token, verify_decode_jwt(token))
+    return verified
+
+
+async def verify_token_async(token):
+    '''
+    verify_token for async views
+    a JWKS refetch runs on the default executor and, with
+    AUTH_VERIFY_WORKERS set, the signature check on verify_executor, so
+    neither blocks the event loop
+    '''
+    verified = token_cache.get(token)
+    if verified is None:
+        rsa_key = await get_signing_key_async(token)
+        if verify_executor is None:
+            payload = decode_jwt(token, rsa_key)
+        else:
+            payload = await asyncio.get_running_loop().run_in_executor(
+                verify_executor, decode_jwt, token, rsa_key)
+        verified = token_cache.put(token, payload)
+    return verified
+
+
 def requires_auth(permission=''):
     'Authentication decorator function'
     def requires_auth_decorator(f):
+        # async def views (Flask 2.0+ installed with the async extra) get
+        # a coroutine wrapper that verifies with verify_token_async
+        if asyncio.iscoroutinefunction(f):
+            @wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                token = get_token_auth_header()
+                verified = await verify_token_async(token)
+                check_permissions(permission, verified.payload,
+                                  verified.permissions)
+                return await f(verified.payload, *args, **kwargs)
+
+            return async_wrapper
+
         @wraps(f)
         def wrapper(*args, **kwargs):
             token = get_token_auth_header()
-            payload = verify_decode_jwt(token)
-            check_permissions(permission, payload)
-            return f(payload, *args, **kwargs)
+            verified = verify_token(token)
+            check_permissions(permission, verified.payload,
+                              verified.permissions)
+            return f(verified.payload, *args, **kwargs)
 
         return wrapper
     return requires_auth_decorator
@@ -1,23 +1,77 @@
 import os
-from sqlalchemy import Column, String, Integer
+from sqlalchemy import Column, String, Integer, event, func, exc, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
 from flask_sqlalchemy import SQLAlchemy
 import json
 
 database_filename = "database.db"
 project_dir = os.path.dirname(os.path.abspath(__file__))
-database_path = "sqlite:///{}".format(os.path.join(project_dir, database_filename))
+database_path = os.environ.get(
+    'DATABASE_URL',
+    "sqlite:///{}".format(os.path.join(project_dir, database_filename)))
 
 db = SQLAlchemy()
 
+'''
+DATABASE_PROFILES
+    SQLite engine options and per-connection PRAGMAs, picked by the
+    DATABASE_PROFILE environment variable
+    default     the SQLite defaults, a new connection for every checkout
+    concurrent  for threaded servers and several worker processes on one
+                database file: WAL lets readers run alongside the writer,
+                synchronous=NORMAL only syncs at checkpoints, reads go
+                through mmap, and a busy writer is waited for instead of
+                failing with "database is locked". connections are pooled
+                and shared across threads
+'''
+DATABASE_PROFILES = {
+    'default': {
+        'engine_options': {},
+        'pragmas': {},
+    },
+    'concurrent': {
+        'engine_options': {
+            'poolclass': QueuePool,
+            'pool_size': 10,
+            'max_overflow': 10,
+            'connect_args': {'check_same_thread': False},
+        },
+        'pragmas': {
+            'busy_timeout': 5000,
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': 256 * 1024 * 1024,
+        },
+    },
+}
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'concurrent')
+
 '''
 setup_db(app)
     binds a flask application and a SQLAlchemy service
+    the database profile only applies to SQLite databases
 '''
-def setup_db(app):
+def setup_db(app, profile=DATABASE_PROFILE):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    settings = DATABASE_PROFILES[profile]
+    is_sqlite = database_path.startswith('sqlite')
+    if is_sqlite:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = settings['engine_options']
     db.app = app
     db.init_app(app)
+    if is_sqlite and settings['pragmas']:
+        event.listen(db.get_engine(app), 'connect',
+                     _sqlite_pragmas(settings['pragmas']))
+
+def _sqlite_pragmas(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return set_pragmas
 
 '''
 db_drop_and_create_all()
@@ -28,6 +82,18 @@ db_drop_and_create_all()
 def db_drop_and_create_all():
     db.drop_all()
     db.create_all()
+    db.session.add(SchemaVersion(version=SCHEMA_VERSION))
+    db.session.commit()
+
+'''
+short_recipe(recipe)
+    the color and parts of each ingredient of a decoded recipe, which is
+    either a list of ingredients or a single ingredient object
+'''
+def short_recipe(recipe):
+    if isinstance(recipe, dict):
+        return {key: recipe[key] for key in ('color', 'parts') if key in recipe}
+    return [short_recipe(ingredient) for ingredient in recipe]
 
 '''
 Drink
@@ -42,20 +108,34 @@ class Drink(db.Model):
     # the required datatype is [{'color': string, 'name':string, 'parts':number}]
     recipe =  Column(String(180), nullable=False)
 
+    '''
+    recipe_data
+        the decoded recipe, parsed once per instance
+        the cache is keyed on the recipe string itself, so assigning a new
+        recipe or reloading the row parses again
+    '''
+    @property
+    def recipe_data(self):
+        return self._decoded_recipe()[1]
+
+    def _decoded_recipe(self):
+        # (recipe string, decoded recipe, short recipe)
+        cached = getattr(self, '_recipe_cache', None)
+        if cached is None or cached[0] is not self.recipe:
+            recipe = json.loads(self.recipe)
+            cached = self._recipe_cache = (self.recipe, recipe,
+                                           short_recipe(recipe))
+        return cached
+
     '''
     short()
         short form representation of the Drink model
     '''
     def short(self):
-
-        short_recipe = {}
-        for r in json.loads(self.recipe):
-            if r == 'color' or r == 'parts':
-                short_recipe[r] = json.loads(self.recipe)[r]
         return {
             'id': self.id,
             'title': self.title,
-            'recipe': short_recipe
+            'recipe': self._decoded_recipe()[2]
         }
 
     '''
@@ -66,7 +146,7 @@ class Drink(db.Model):
         return {
             'id': self.id,
             'title': self.title,
-            'recipe': json.loads(self.recipe)
+            'recipe': self.recipe_data
         }
 
     '''
@@ -108,3 +188,108 @@ class Drink(db.Model):
 
     def __repr__(self):
         return json.dumps(self.short())
+
+'''
+MenuChange
+one row per drink write, the append only log behind the menu version
+    version is never reused, so it increases monotonically; the menu
+    version is the highest version in the log
+'''
+class MenuChange(db.Model):
+    __tablename__ = 'menu_change'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    version = Column(Integer, primary_key=True)
+    drink_id = Column(Integer, nullable=False, index=True)
+
+'''
+menu_version()
+    the current menu version, 0 before the first write
+'''
+def menu_version():
+    return db.session.query(
+        func.coalesce(func.max(MenuChange.version), 0)).scalar()
+
+
+@event.listens_for(Session, 'after_flush')
+def _log_drink_changes(session, flush_context):
+    for drink in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(drink, Drink):
+            continue
+        if drink in session.dirty and not session.is_modified(drink):
+            continue
+        # logged within the flush's transaction, so a rolled back write
+        # leaves no version behind
+        result = session.connection().execute(
+            MenuChange.__table__.insert(), {'drink_id': drink.id})
+        drink.menu_version = result.inserted_primary_key[0]
+
+
+'''
+SchemaVersion
+the single row table holding the version of the database schema
+'''
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+
+    version = Column(Integer, primary_key=True)
+
+'''
+MIGRATIONS
+    the tables each schema version adds, in order; version 1 is the
+    original drink table, databases created before versioning have it
+'''
+MIGRATIONS = [
+    (1, [Drink.__table__]),
+    (2, [MenuChange.__table__]),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+'''
+schema_version()
+    the version recorded in the database, None when it has none
+'''
+def schema_version():
+    try:
+        return db.session.query(SchemaVersion.version).scalar()
+    except exc.SQLAlchemyError:
+        db.session.rollback()
+        return None
+
+'''
+check_schema()
+    the fast startup check, a single row read whatever the data size
+    raises RuntimeError when the database is not at SCHEMA_VERSION
+'''
+def check_schema():
+    version = schema_version()
+    if version != SCHEMA_VERSION:
+        raise RuntimeError(
+            f'database schema is at version {version}, expected '
+            f'{SCHEMA_VERSION}; run `flask migrate-db` (or `flask init-db` '
+            f'for a new database)')
+
+'''
+migrate_db()
+    brings the database up to SCHEMA_VERSION, keeping its data, and
+    returns the version it started from
+'''
+def migrate_db():
+    version = schema_version()
+    if version is None:
+        # unversioned, either empty or created by db_drop_and_create_all
+        # before the menu change log existed
+        version = 1 if Drink.__tablename__ in \
+            inspect(db.engine).get_table_names() else 0
+    start = version
+    SchemaVersion.__table__.create(db.engine, checkfirst=True)
+    for target, tables in MIGRATIONS:
+        if target <= version:
+            continue
+        for table in tables:
+            table.create(db.engine, checkfirst=True)
+        version = target
+    db.session.query(SchemaVersion).delete()
+    db.session.add(SchemaVersion(version=version))
+    db.session.commit()
+    return start
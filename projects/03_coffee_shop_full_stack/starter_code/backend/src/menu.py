@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import io
+import json
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .database.models import Drink, menu_version
+
+# how often a snapshot checks the menu version for writes made by other
+# workers; writes made in this process invalidate it right away
+MENU_RECHECK_INTERVAL = 2
+
+# bumped by every commit that writes a Drink, in this process
+_generation = 0
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_drink_writes(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Drink):
+            session.info['menu_changed'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_menu(session):
+    global _generation
+    if session.info.pop('menu_changed', False):
+        _generation += 1
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_drink_writes(session):
+    session.info.pop('menu_changed', None)
+
+
+# one encoding of a projection: the JSON body, its gzip and its ETag
+Variant = namedtuple('Variant', ['body', 'gzip_body', 'etag'])
+
+MenuSnapshot = namedtuple('MenuSnapshot', ['generation', 'version',
+                                           'checked_at', 'short', 'long'])
+
+
+def _gzip(body):
+    buffer = io.BytesIO()
+    # a fixed mtime keeps the gzip bytes, and so their ETag, stable
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as f:
+        f.write(body)
+    return buffer.getvalue()
+
+
+def _variant(drinks, version):
+    body = json.dumps({
+        'success': True,
+        'drinks': drinks,
+        'version': version,
+    }, sort_keys=True, separators=(',', ':')).encode()
+    return Variant(body, _gzip(body), hashlib.sha1(body).hexdigest())
+
+
+class MenuSnapshots(object):
+    '''
+    Materialized /drinks and /drinks-detail responses
+
+    The short and long menus are kept as encoded JSON, plain and gzipped,
+    with a strong ETag each. They are rebuilt together by the first read
+    after a drink write committed in this process, or after another worker
+    moved the menu version (checked every MENU_RECHECK_INTERVAL seconds).
+    '''
+
+    def __init__(self, recheck_interval=MENU_RECHECK_INTERVAL):
+        self.recheck_interval = recheck_interval
+        self.builds = 0
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        generation = _generation
+        version = menu_version()
+        drinks = Drink.query.order_by(Drink.id).all()
+        self.builds += 1
+        return MenuSnapshot(generation, version, time.monotonic(),
+                            _variant([drink.short() for drink in drinks],
+                                     version),
+                            _variant([drink.long() for drink in drinks],
+                                     version))
+
+    def _is_current(self, snapshot):
+        if snapshot is None or snapshot.generation != _generation:
+            return False
+        if time.monotonic() - snapshot.checked_at < self.recheck_interval:
+            return True
+        if menu_version() != snapshot.version:
+            return False
+        self._snapshot = snapshot._replace(checked_at=time.monotonic())
+        return True
+
+    def current(self):
+        snapshot = self._snapshot
+        if not self._is_current(snapshot):
+            with self._lock:
+                snapshot = self._snapshot
+                if not self._is_current(snapshot):
+                    snapshot = self._snapshot = self._build()
+        return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+
+def serve_variant(app, request, variant):
+    '''
+    Response for a pre-encoded variant, gzipped when the client accepts it
+    answers 304 when If-None-Match holds the variant's ETag
+    '''
+    use_gzip = request.accept_encodings['gzip'] > 0
+    response = app.response_class(
+        variant.gzip_body if use_gzip else variant.body,
+        mimetype='application/json')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    # each encoding is a different representation, with its own ETag
+    response.set_etag(variant.etag + ('-gzip' if use_gzip else ''))
+    return response.make_conditional(request)